@@ -1,14 +1,24 @@
 from __future__ import annotations
 
 import os
+from contextlib import closing
+from datetime import datetime, timedelta
 from pathlib import Path
 
 import pandas as pd
-import plotly.graph_objects as go
 import streamlit as st
 
 from src.knee_shoulder.config import load_config
-from src.knee_shoulder.storage import load_existing_history, load_validation_history
+from src.knee_shoulder.signal_store import (
+    open_signal_store,
+    query_rollups,
+    query_signals,
+    sync_signal_files,
+    sync_validation_file,
+    update_rollups,
+)
+from src.knee_shoulder.storage import load_existing_history, load_latest_rescore_snapshot, load_validation_history
+from src.knee_shoulder.views import load_latest_signals, select_candidates, select_recent_validation
 
 
 st.set_page_config(page_title="Knee Shoulder Monitor", page_icon="🌻", layout="wide")
@@ -42,7 +52,6 @@ st.caption("Daily close-based reversal monitoring dashboard for Korean stocks.")
 
 config = load_config()
 paths = config["paths"]
-CANDIDATE_DISPLAY_MIN_SCORE = 50
 CANDIDATE_TABLE_HEIGHT = 245
 
 
@@ -97,12 +106,14 @@ def render_validation_help() -> None:
         st.markdown("- 해석할 때는 매수 후보는 수익률이 플러스인지, 매도 후보는 수익률이 마이너스인지 먼저 보면 됩니다.")
 
 
-def load_latest_signals(signal_dir: str) -> tuple[pd.DataFrame, str | None]:
-    files = sorted(Path(signal_dir).glob("*_signals.csv"))
-    if not files:
-        return pd.DataFrame(), None
-    latest = files[-1]
-    return pd.read_csv(latest, dtype={"symbol": str}), latest.stem.replace("_signals", "")
+def signal_store_path() -> str:
+    # data/db is not committed, so the dashboard keeps its own copy of the store in step with the CSVs.
+    # Syncs import only new or rewritten files; rollups are folded only when one of them changed something.
+    with closing(open_signal_store(paths["signal_db"])) as store:
+        imported = sync_signal_files(store, paths["signal_dir"], paths.get("archive_dir"))
+        if sync_validation_file(store, paths["validation_file"]) or imported:
+            update_rollups(store, config["validation"])
+    return paths["signal_db"]
 
 
 def prepare_history_for_chart(history: pd.DataFrame) -> pd.DataFrame:
@@ -207,18 +218,24 @@ if signals_df.empty:
     st.warning("No signal file found yet. Run `python3 run_daily.py` first.")
     st.stop()
 
-header_cols = st.columns(3)
 analysis_date = signal_date or "-"
+snapshot_df, snapshot_stamp = load_latest_rescore_snapshot(paths.get("snapshot_dir", "data/snapshots"))
+if snapshot_stamp and snapshot_stamp[:8] >= analysis_date:
+    if st.toggle(f"장중 재평가 스냅샷 보기 ({snapshot_stamp})", value=False):
+        snapshot_symbols = set(snapshot_df["symbol"])
+        signals_df = pd.concat(
+            [snapshot_df, signals_df[~signals_df["symbol"].isin(snapshot_symbols)]],
+            ignore_index=True,
+        )
+        st.caption("재평가한 종목은 스냅샷 점수로, 나머지 종목은 일일 배치 점수로 표시합니다.")
+
+header_cols = st.columns(3)
 header_cols[0].metric("Analysis Date", analysis_date)
 header_cols[1].metric("Knee Strong", int((signals_df["knee_grade"] == "Strong").sum()))
 header_cols[2].metric("Shoulder Strong", int((signals_df["shoulder_grade"] == "Strong").sum()))
 
-knee_view = signals_df[signals_df["knee_score"] >= CANDIDATE_DISPLAY_MIN_SCORE].copy().sort_values(
-    ["knee_score", "pct_change"], ascending=[False, False]
-)
-shoulder_view = signals_df[signals_df["shoulder_score"] >= CANDIDATE_DISPLAY_MIN_SCORE].copy().sort_values(
-    ["shoulder_score", "pct_change"], ascending=[False, True]
-)
+knee_view = select_candidates(signals_df, "knee")
+shoulder_view = select_candidates(signals_df, "shoulder")
 
 knee_header_col, knee_help_col = st.columns([20, 1])
 with knee_header_col:
@@ -272,6 +289,8 @@ selected_row = signals_df[signals_df["symbol"] == selected_symbol].iloc[0]
 history = load_existing_history(Path(paths["raw_dir"]) / f"{selected_symbol}.csv")
 
 if not history.empty:
+    import plotly.graph_objects as go
+
     history = prepare_history_for_chart(history)
     figure = go.Figure()
     figure.add_trace(go.Scatter(x=history["date"], y=history["close"], mode="lines", name="Close"))
@@ -292,21 +311,30 @@ if not history.empty:
     )
     st.plotly_chart(figure, use_container_width=True)
 
+    flow_columns = {"foreign_net_qty": "외국인", "institution_net_qty": "기관"}
+    if all(column in history.columns for column in flow_columns):
+        flow_history = history.dropna(subset=list(flow_columns), how="all")
+        if not flow_history.empty:
+            st.caption("투자자별 순매수 수량")
+            flow_figure = go.Figure()
+            for column, label in flow_columns.items():
+                flow_figure.add_trace(go.Bar(x=flow_history["date"], y=flow_history[column], name=label))
+            flow_figure.update_layout(
+                height=260,
+                barmode="group",
+                margin=dict(l=20, r=20, t=20, b=20),
+                xaxis=dict(tickformat="%Y-%m-%d", type="date"),
+                yaxis=dict(title="Net Qty", tickformat=",d"),
+            )
+            st.plotly_chart(flow_figure, use_container_width=True)
+
 validation_header_col, validation_help_col = st.columns([20, 1])
 with validation_header_col:
     st.subheader("예측평가")
 with validation_help_col:
     render_validation_help()
 if not validation_df.empty:
-    eval_view = validation_df[validation_df["signal_date"].astype(str) < analysis_date].copy()
-    if not eval_view.empty:
-        eval_view = eval_view[
-            (pd.to_numeric(eval_view["knee_score"], errors="coerce") >= CANDIDATE_DISPLAY_MIN_SCORE)
-            | (pd.to_numeric(eval_view["shoulder_score"], errors="coerce") >= CANDIDATE_DISPLAY_MIN_SCORE)
-        ].copy()
-        recent_dates = sorted(eval_view["signal_date"].astype(str).unique())[-5:]
-        eval_view = eval_view[eval_view["signal_date"].astype(str).isin(recent_dates)].copy()
-        eval_view = eval_view.sort_values(["signal_date", "knee_score", "shoulder_score"], ascending=[False, False, False])
+    eval_view = select_recent_validation(validation_df, analysis_date)
 
     if eval_view.empty:
         st.info("아직 표시할 예측평가 데이터가 없습니다.")
@@ -317,6 +345,70 @@ if not validation_df.empty:
 else:
     st.info("예측평가 데이터가 아직 없습니다.")
 
+store_path = signal_store_path()
+
+st.subheader("누적 성과 통계")
+st.caption("검증이 끝난 신호를 새 결과가 들어올 때마다 누적 집계한 승률과 수익률입니다.")
+stats_cols = st.columns(2)
+stats_side = stats_cols[0].selectbox("구분", options=["knee", "shoulder"], format_func=lambda side: side.title(), key="stats_side")
+stats_horizon = stats_cols[1].selectbox(
+    "보유 기간", options=config["validation"]["forward_days"], index=None, placeholder="전체", format_func=lambda days: f"{days}일"
+)
+stats_tabs = st.tabs(["전체", "등급별", "점수 구간별", "평가근거별", "월별"])
+with closing(open_signal_store(store_path)) as store:
+    for stats_tab, dimension in zip(stats_tabs, ["all", "grade", "score_decile", "reason", "month"]):
+        rollup = query_rollups(store, side=stats_side, dimension=dimension, horizon=stats_horizon)
+        with stats_tab:
+            if rollup.empty:
+                st.info("아직 집계된 검증 결과가 없습니다.")
+                continue
+            st.dataframe(
+                rollup.rename(
+                    columns={
+                        "bucket": "구간",
+                        "horizon": "보유 기간(일)",
+                        "count": "신호 수",
+                        "successes": "성공 수",
+                        "win_rate": "승률(%)",
+                        "mean_ret": "평균 수익률",
+                        "std_ret": "수익률 표준편차",
+                    }
+                ),
+                use_container_width=True,
+                hide_index=True,
+            )
+
+st.subheader("과거 신호 이력")
+st.caption("일자별 신호 파일을 인덱스된 신호 저장소에서 조회합니다.")
+history_cols = st.columns([2, 1, 1, 1, 1])
+history_symbol = history_cols[0].text_input("종목코드", value="", placeholder="예: 005930").strip()
+history_side = history_cols[1].selectbox("구분", options=["knee", "shoulder"], format_func=lambda side: side.title())
+history_grade = history_cols[2].selectbox("등급", options=["전체", "Strong", "Watch", "Neutral"])
+history_min_score = history_cols[3].number_input("최소 점수", min_value=0, max_value=100, value=0, step=5)
+history_days = history_cols[4].number_input("최근 일수", min_value=1, max_value=3650, value=60, step=10)
+
+history_since = (datetime.strptime(analysis_date, "%Y%m%d") - timedelta(days=int(history_days))).strftime("%Y%m%d")
+with closing(open_signal_store(store_path)) as store:
+    signal_history = query_signals(
+        store,
+        symbol=history_symbol.zfill(6) if history_symbol else None,
+        side=history_side,
+        grade=None if history_grade == "전체" else history_grade,
+        min_score=int(history_min_score) or None,
+        since=history_since,
+        limit=500,
+    )
+if signal_history.empty:
+    st.info("조건에 맞는 과거 신호가 없습니다.")
+else:
+    st.dataframe(
+        signal_history[
+            ["date", "symbol", "name", "close", "pct_change", f"{history_side}_score", f"{history_side}_grade", f"{history_side}_reasons"]
+        ],
+        use_container_width=True,
+        hide_index=True,
+    )
+
 st.markdown(
     """
     <div style="text-align:center; color:#6b7280; font-size:12px; margin-top:48px; padding-bottom:16px;">
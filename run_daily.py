@@ -2,22 +2,70 @@ from __future__ import annotations
 
 import argparse
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
 
 import pandas as pd
 
 from src.knee_shoulder.config import load_config, load_secrets
-from src.knee_shoulder.kis_client import KisAuth, fetch_daily_history, issue_access_token, throttle
-from src.knee_shoulder.master import build_stock_master_from_excel, load_stock_master
+from src.knee_shoulder.fetch_planner import FetchPlan, plan_fetches
+from src.knee_shoulder.http_cache import CACHE_MODES, HttpCache, evict_http_cache
+from src.knee_shoulder.kis_client import (
+    KIS_MAX_DAILY_ROWS,
+    KisAuth,
+    fetch_current_price,
+    fetch_daily_history,
+    fetch_investor_trade_by_stock_daily,
+    issue_access_token,
+    throttle,
+)
+from src.knee_shoulder.master import build_stock_master_from_excel, load_master_meta, load_stock_master, mark_backfilled
+from src.knee_shoulder.sharding import (
+    load_shard_frames,
+    load_shard_manifests,
+    parse_shard,
+    remove_shard_outputs,
+    save_shard_manifest,
+    select_shard,
+    shard_cache_path,
+    shard_label,
+    shard_manifest_path,
+    shard_output_path,
+)
+from src.knee_shoulder.quality import (
+    build_repair_plan,
+    find_overlap_mismatches,
+    load_history_panel,
+    load_known_gaps,
+    load_repair_plan,
+    save_known_gaps,
+    save_repair_plan,
+    scan_history_quality,
+)
+from src.knee_shoulder.signal_store import (
+    load_all_signals,
+    open_signal_store,
+    sync_signal_files,
+    sync_validation_file,
+    update_rollups,
+)
 from src.knee_shoulder.signals import SignalThresholds, score_symbol
+from src.knee_shoulder.trading_calendar import SESSION_OPEN, TradingCalendar, load_trading_calendar
 from src.knee_shoulder.storage import (
+    archive_daily_files,
+    attach_investor_flow,
     ensure_directories,
-    get_latest_history_date,
-    load_all_signal_files,
+    load_existing_history,
+    load_history_cache,
+    load_latest_patch_session,
     merge_and_save_history,
+    prune_rescore_snapshots,
     save_daily_patch,
     save_daily_signals,
+    save_history_cache,
+    save_publish_manifest,
+    save_rescore_snapshot,
+    replace_history,
     save_validation_history,
 )
 from src.knee_shoulder.validation import build_validation_rows
@@ -39,19 +87,408 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--secrets", default=None, help="Path to secrets.json")
     parser.add_argument("--master-source", default=None, help="Source Excel file for stock master rebuild")
     parser.add_argument("--rebuild-master", action="store_true", help="Rebuild stock master CSV from the source Excel")
+    parser.add_argument("--force-master", action="store_true", help="Rebuild the stock master even if the source Excel is unchanged")
+    parser.add_argument("--rescore", action="store_true", help="Rescore a symbol subset from the current bar without a full batch")
+    parser.add_argument("--symbols", default=None, help="Comma separated symbols to rescore")
+    parser.add_argument("--min-score", type=int, default=None, help="Rescore latest candidates with knee or shoulder score at or above this")
+    parser.add_argument("--shard", default=None, help="Process only shard i/N of the stock master and write partial outputs")
+    parser.add_argument("--merge-shards", type=int, default=None, help="Merge N shard outputs into the daily patch/signal files")
+    parser.add_argument("--scan-quality", action="store_true", help="Scan stored history for gaps and bad bars and write a repair plan")
+    parser.add_argument("--date", default=None, help="Target date (YYYYMMDD) for the batch, --rescore, --merge-shards or --scan-quality, defaults to today")
+    parser.add_argument(
+        "--http-cache",
+        choices=CACHE_MODES,
+        default="passthrough",
+        help="record: save KIS responses, replay: serve saved responses offline, passthrough: no cache",
+    )
     return parser.parse_args()
 
 
-def resolve_fetch_start_date(raw_path: Path, runtime: dict, end_date_dt: datetime) -> str:
-    latest_stored = get_latest_history_date(raw_path)
-    if not latest_stored:
-        return (end_date_dt - timedelta(days=runtime["history_lookback_days"])).strftime("%Y%m%d")
+def select_rescore_symbols(args: argparse.Namespace, master: pd.DataFrame, signal_dir: str, runtime: dict) -> pd.DataFrame:
+    if args.symbols:
+        symbols = {symbol.strip().zfill(6) for symbol in args.symbols.split(",") if symbol.strip()}
+        return master[master["symbol"].isin(symbols)].reset_index(drop=True)
+
+    min_score = args.min_score if args.min_score is not None else runtime["signal_threshold"]
+    files = sorted(Path(signal_dir).glob("*_signals.csv"))
+    if not files:
+        return master.iloc[0:0]
+    latest = pd.read_csv(files[-1], dtype={"symbol": str})
+    candidates = latest[(latest["knee_score"] >= min_score) | (latest["shoulder_score"] >= min_score)]
+    return master[master["symbol"].isin(set(candidates["symbol"]))].reset_index(drop=True)
+
+
+def run_rescore(
+    args: argparse.Namespace,
+    paths: dict,
+    runtime: dict,
+    master: pd.DataFrame,
+    calendar: TradingCalendar,
+    auth: KisAuth,
+    thresholds: SignalThresholds,
+    run_at_dt: datetime,
+) -> None:
+    today = run_at_dt.strftime("%Y%m%d")
+    # Outside a session the current price is just the last close, and appending it as today's bar skews every window.
+    if not calendar.is_session(today) or run_at_dt.time() < SESSION_OPEN:
+        logging.warning("Market is not open at %s, skipping rescore", run_at_dt.isoformat(timespec="minutes"))
+        return
+
+    targets = select_rescore_symbols(args, master, paths["signal_dir"], runtime)
+    logging.info("Rescoring %s symbols", len(targets))
+    if targets.empty:
+        return
+
+    access_token = issue_access_token(auth)
+    cache = load_history_cache(Path(paths["history_cache"]))
+    signal_rows = []
+
+    for stock in targets.itertuples(index=False):
+        history = cache.get(stock.symbol)
+        if history is None:
+            history = load_existing_history(Path(paths["raw_dir"]) / f"{stock.symbol}.csv")
+        if history.empty:
+            logging.warning("No stored history for %s", stock.symbol)
+            continue
+
+        bar = fetch_current_price(auth, access_token, stock.symbol)
+        throttle(runtime["request_sleep_sec"])
+        if not bar["close"]:
+            logging.warning("No current price for %s", stock.symbol)
+            continue
+
+        current = pd.DataFrame([{"date": today, **bar}])
+        history = pd.concat([history[history["date"].astype(str) < today], current], ignore_index=True)
+        signal = score_symbol(history, stock.symbol, stock.name, thresholds)
+        if signal:
+            signal_rows.append(signal)
+
+    if not signal_rows:
+        logging.warning("No signals rescored.")
+        return
+
+    snapshot = pd.DataFrame(signal_rows)
+    snapshot["analysis_date"] = today
+    snapshot["run_at"] = run_at_dt.isoformat(timespec="seconds")
+    snapshot_path = save_rescore_snapshot(paths["snapshot_dir"], snapshot, f"{run_at_dt:%Y%m%d_%H%M%S}")
+    logging.info("Saved rescore snapshot: %s (%s rows)", snapshot_path, len(snapshot))
+    pruned = prune_rescore_snapshots(paths["snapshot_dir"], runtime.get("rescore_snapshot_keep", 20))
+    if pruned:
+        logging.info("Pruned %s old rescore snapshots", pruned)
+
+
+def run_quality_scan(paths: dict, runtime: dict, master: pd.DataFrame, calendar: TradingCalendar, run_date: str) -> None:
+    quality_dir = Path(paths["quality_dir"])
+    last_session = calendar.previous_session(run_date)
+    panel = load_history_panel(paths["raw_dir"], master["symbol"].tolist())
+    issues = scan_history_quality(
+        panel,
+        calendar,
+        last_session,
+        runtime.get("stale_after_sessions", 5),
+        load_known_gaps(quality_dir / "known_gaps.csv"),
+    )
+    repair_plan = build_repair_plan(issues, calendar)
+
+    quality_dir.mkdir(parents=True, exist_ok=True)
+    issues.to_csv(quality_dir / f"{run_date}_issues.csv", index=False, encoding="utf-8-sig")
+    save_repair_plan(quality_dir / "repair_plan.csv", repair_plan)
+
+    logging.info("Scanned %s bars across %s symbols through %s", len(panel), panel["symbol"].nunique(), last_session)
+    for issue, count in issues["issue"].value_counts().sort_index().items():
+        logging.info("  %s: %s", issue, count)
+    logging.info("Repair plan: %s ranges for %s symbols", len(repair_plan), repair_plan["symbol"].nunique())
+
+
+def run_repairs(
+    paths: dict,
+    runtime: dict,
+    plan: FetchPlan,
+    calendar: TradingCalendar,
+    auth: KisAuth | None,
+    access_token: str | None,
+) -> tuple[list[str], pd.DataFrame]:
+    repaired = []
+    gaps = []
+    for task in plan.repairs:
+        raw_path = Path(paths["raw_dir"]) / f"{task.symbol}.csv"
+        logging.info("Repairing %s %s from %s to %s (%s)", task.symbol, task.name, task.start_date, task.end_date, task.reason)
+        history = fetch_daily_history(auth, access_token, task.symbol, task.start_date, task.end_date)
+        throttle(runtime["request_sleep_sec"])
+        fetched_dates = set(history["date"]) if not history.empty else set()
+        unresolved = [date for date in calendar.sessions(task.start_date, task.end_date) if date not in fetched_dates]
+        if unresolved:
+            # The API has no bar for these sessions (e.g. trading halt); stop flagging them.
+            logging.warning("No bars for %s on %s sessions, recording as known gaps", task.symbol, len(unresolved))
+            gaps.append(pd.DataFrame({"symbol": task.symbol, "date": unresolved}))
+        if not history.empty:
+            merge_and_save_history(raw_path, history, prefer_incoming=True)
+        repaired.append(task.symbol)
+    known_gaps = pd.concat(gaps, ignore_index=True) if gaps else pd.DataFrame(columns=["symbol", "date"])
+    return repaired, known_gaps
+
+
+def apply_repair_results(paths: dict, repaired: list[str], known_gaps: pd.DataFrame) -> None:
+    if not repaired:
+        return
+    quality_dir = Path(paths["quality_dir"])
+    repair_plan = load_repair_plan(quality_dir / "repair_plan.csv")
+    save_repair_plan(quality_dir / "repair_plan.csv", repair_plan[~repair_plan["symbol"].isin(repaired)])
+    save_known_gaps(quality_dir / "known_gaps.csv", known_gaps)
+    logging.info("Repaired %s symbols, %s known gaps recorded", len(set(repaired)), len(known_gaps))
+
+
+def refetch_full_history(
+    raw_path: Path,
+    symbol: str,
+    calendar: TradingCalendar,
+    end_date: str,
+    auth: KisAuth,
+    access_token: str,
+    runtime: dict,
+    flow: pd.DataFrame | None = None,
+) -> pd.DataFrame:
+    stored = load_existing_history(raw_path)
+    start_date = str(stored["date"].min())
+    frames = []
+    for window_start, window_end in calendar.session_windows(start_date, end_date, KIS_MAX_DAILY_ROWS):
+        frames.append(fetch_daily_history(auth, access_token, symbol, window_start, window_end))
+        throttle(runtime["request_sleep_sec"])
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        logging.warning("Full refetch for %s returned no bars, keeping stored history", symbol)
+        return stored
+    refetched = pd.concat(frames, ignore_index=True)
+    if flow is not None:
+        # Investor flow fetched for the incremental window would otherwise be dropped with it.
+        refetched = attach_investor_flow(refetched, flow)
+    return replace_history(raw_path, refetched)
+
+
+def run_batch(
+    paths: dict,
+    runtime: dict,
+    master: pd.DataFrame,
+    plan: FetchPlan,
+    calendar: TradingCalendar,
+    auth: KisAuth | None,
+    access_token: str | None,
+    thresholds: SignalThresholds,
+    run_at_dt: datetime,
+) -> tuple[pd.DataFrame, pd.DataFrame, dict[str, pd.DataFrame], list[str]]:
+    end_date = run_at_dt.strftime("%Y%m%d")
+
+    collect_investor_flow = bool(runtime.get("collect_investor_flow", False))
+    if collect_investor_flow and plan.tasks:
+        logging.info("Investor flow collection enabled")
+
+    tasks = {task.symbol: task for task in plan.tasks}
+    patch_rows = []
+    signal_rows = []
+    histories = {}
+    backfilled = []
+    adjusted = []
+
+    for stock in master.itertuples(index=False):
+        raw_path = Path(paths["raw_dir"]) / f"{stock.symbol}.csv"
+        task = tasks.get(stock.symbol)
+        if task is None:
+            # Already complete through the last session: rescore from storage without an API call.
+            merged = load_existing_history(raw_path)
+            if merged.empty:
+                continue
+            latest_row = merged.iloc[[-1]].copy()
+        else:
+            logging.info(
+                "Fetching %s %s from %s to %s (latest stored: %s)",
+                stock.symbol,
+                stock.name,
+                task.start_date,
+                task.end_date,
+                task.latest_stored or "none",
+            )
+            history = fetch_daily_history(auth, access_token, stock.symbol, task.start_date, task.end_date)
+            throttle(runtime["request_sleep_sec"])
+            if history.empty:
+                logging.warning("No history for %s", stock.symbol)
+                continue
+
+            flow = None
+            if collect_investor_flow:
+                flow = fetch_investor_trade_by_stock_daily(auth, access_token, stock.symbol, task.start_date, task.end_date)
+                throttle(runtime["request_sleep_sec"])
+                if flow.empty:
+                    logging.warning("No investor flow for %s", stock.symbol)
+                history = attach_investor_flow(history, flow)
+
+            latest_row = history.iloc[[-1]].copy()
+            mismatches = []
+            if task.latest_stored:
+                mismatches = find_overlap_mismatches(
+                    load_existing_history(raw_path), history, runtime.get("adjustment_tolerance_pct", 0.5)
+                )
+            if mismatches:
+                logging.warning(
+                    "Stored prices for %s disagree on %s overlap sessions (%s); refetching full history",
+                    stock.symbol,
+                    len(mismatches),
+                    ", ".join(mismatches),
+                )
+                merged = refetch_full_history(
+                    raw_path, stock.symbol, calendar, task.end_date, auth, access_token, runtime, flow
+                )
+                adjusted.append(stock.symbol)
+            else:
+                merged = merge_and_save_history(raw_path, history)
+            if task.backfill:
+                backfilled.append(stock.symbol)
+
+        latest_row["symbol"] = stock.symbol
+        latest_row["name"] = stock.name
+        latest_row["fetched_at"] = run_at_dt.isoformat(timespec="seconds")
+        latest_row["analysis_date"] = end_date
+        patch_rows.append(latest_row)
+
+        histories[stock.symbol] = merged
+        signal = score_symbol(merged, stock.symbol, stock.name, thresholds)
+        if signal:
+            signal_rows.append(signal)
+
+    if adjusted:
+        logging.info("Replaced history for %s symbols after price adjustments: %s", len(adjusted), ", ".join(adjusted))
+
+    patch_df = pd.concat(patch_rows, ignore_index=True) if patch_rows else pd.DataFrame()
+    signals_df = pd.DataFrame(signal_rows)
+    if not signals_df.empty:
+        signals_df["analysis_date"] = end_date
+        signals_df["run_at"] = run_at_dt.isoformat(timespec="seconds")
+    return patch_df, signals_df, histories, backfilled
+
+
+def publish_outputs(
+    paths: dict,
+    validation_config: dict,
+    end_date: str,
+    patch_df: pd.DataFrame,
+    signals_df: pd.DataFrame,
+    archive_after_days: int = 0,
+) -> None:
+    latest_date = end_date
+    save_daily_patch(Path(paths["patch_dir"]) / f"{latest_date}_prices.csv", patch_df)
+
+    if not signals_df.empty:
+        save_daily_signals(Path(paths["signal_dir"]) / f"{latest_date}_signals.csv", signals_df)
+
+    if archive_after_days > 0:
+        for source_dir, kind in [(paths["patch_dir"], "prices"), (paths["signal_dir"], "signals")]:
+            archived = archive_daily_files(source_dir, paths["archive_dir"], kind, archive_after_days)
+            if archived:
+                logging.info("Archived %s daily %s files into %s", len(archived), kind, paths["archive_dir"])
+
+    if signals_df.empty:
+        logging.warning("No signals calculated.")
+        return
+
+    store = open_signal_store(paths["signal_db"])
+    try:
+        sync_signal_files(store, paths["signal_dir"], paths.get("archive_dir"))
+        all_signals_df = load_all_signals(store)
+        new_validation = build_validation_rows(all_signals_df, paths["raw_dir"], validation_config["forward_days"])
+        validation_path = Path(paths["validation_file"])
+        validation_all = new_validation.drop_duplicates(subset=["signal_date", "symbol"]).sort_values(["signal_date", "symbol"])
+        save_validation_history(validation_path, validation_all)
+        sync_validation_file(store, paths["validation_file"])
+        applied_cells = update_rollups(store, validation_config)
+    finally:
+        store.close()
+
+    save_publish_manifest(
+        Path(paths["publish_manifest"]),
+        {
+            "date": latest_date,
+            "published_at": datetime.now().isoformat(timespec="seconds"),
+            "patch_file": str(Path(paths["patch_dir"]) / f"{latest_date}_prices.csv"),
+            "signal_file": str(Path(paths["signal_dir"]) / f"{latest_date}_signals.csv"),
+            "validation_file": paths["validation_file"],
+            "signals": len(signals_df),
+            "validation_rows": len(validation_all),
+        },
+    )
+
+    logging.info("Saved patch rows: %s", len(patch_df))
+    logging.info("Saved signals: %s", len(signals_df))
+    logging.info("Validation rows rebuilt: %s", len(new_validation))
+    logging.info("Rollup cells applied: %s", applied_cells)
+
+
+def save_shard_outputs(
+    paths: dict,
+    end_date: str,
+    shard: tuple[int, int],
+    patch_df: pd.DataFrame,
+    signals_df: pd.DataFrame,
+    histories: dict[str, pd.DataFrame],
+    backfilled: list[str],
+    repaired: list[str],
+    known_gaps: pd.DataFrame,
+) -> None:
+    shard_index, shard_count = shard
+    if not patch_df.empty:
+        save_daily_patch(shard_output_path(paths["patch_dir"], end_date, "prices", shard_index, shard_count), patch_df)
+    if not signals_df.empty:
+        save_daily_signals(shard_output_path(paths["signal_dir"], end_date, "signals", shard_index, shard_count), signals_df)
+    save_history_cache(shard_cache_path(paths["history_cache"], shard_index, shard_count), histories)
+    save_shard_manifest(
+        shard_manifest_path(paths["patch_dir"], end_date, shard_index, shard_count),
+        {
+            "date": end_date,
+            "shard": shard_label(shard_index, shard_count),
+            "patch_rows": len(patch_df),
+            "signal_rows": len(signals_df),
+            "backfilled": backfilled,
+            "repaired": repaired,
+            "known_gaps": known_gaps[["symbol", "date"]].values.tolist(),
+        },
+    )
+    logging.info("Saved shard %s/%s: %s patch rows, %s signals", shard_index, shard_count, len(patch_df), len(signals_df))
 
-    latest_dt = datetime.strptime(latest_stored, "%Y%m%d")
-    start_dt = latest_dt + timedelta(days=1)
-    if start_dt > end_date_dt:
-        start_dt = end_date_dt
-    return start_dt.strftime("%Y%m%d")
+
+def merge_shards(paths: dict, runtime: dict, validation_config: dict, end_date: str, shard_count: int) -> None:
+    manifests = load_shard_manifests(paths["patch_dir"], end_date, shard_count)
+    if all(manifest.get("skipped") for manifest in manifests):
+        logging.info("Every shard skipped %s, nothing to merge", end_date)
+        remove_shard_outputs([paths["patch_dir"], paths["signal_dir"]], end_date, shard_count)
+        return
+    patch_df = load_shard_frames(paths["patch_dir"], end_date, "prices", shard_count)
+    signals_df = load_shard_frames(paths["signal_dir"], end_date, "signals", shard_count)
+    logging.info("Merging %s shards for %s", shard_count, end_date)
+
+    histories = {}
+    for shard_index in range(shard_count):
+        cache_path = shard_cache_path(paths["history_cache"], shard_index, shard_count)
+        histories.update(load_history_cache(cache_path))
+        if cache_path.exists():
+            cache_path.unlink()
+    if histories:
+        save_history_cache(Path(paths["history_cache"]), histories)
+    mark_backfilled(paths["stock_master"], [symbol for manifest in manifests for symbol in manifest.get("backfilled", [])])
+    apply_repair_results(
+        paths,
+        [symbol for manifest in manifests for symbol in manifest.get("repaired", [])],
+        pd.DataFrame(
+            [gap for manifest in manifests for gap in manifest.get("known_gaps", [])],
+            columns=["symbol", "date"],
+        ),
+    )
+
+    if patch_df.empty:
+        logging.warning("No daily rows collected.")
+    else:
+        patch_df = patch_df.sort_values("symbol").reset_index(drop=True)
+        publish_outputs(
+            paths, validation_config, end_date, patch_df, signals_df, runtime.get("archive_after_days", 0)
+        )
+    remove_shard_outputs([paths["patch_dir"], paths["signal_dir"]], end_date, shard_count)
 
 
 def main() -> None:
@@ -68,6 +505,8 @@ def main() -> None:
             paths["patch_dir"],
             paths["signal_dir"],
             str(Path(paths["validation_file"]).parent),
+            paths["quality_dir"],
+            paths["archive_dir"],
             paths["log_dir"],
         ]
     )
@@ -76,8 +515,17 @@ def main() -> None:
     if args.rebuild_master:
         if not args.master_source:
             raise ValueError("--master-source is required with --rebuild-master")
-        master_df = build_stock_master_from_excel(args.master_source, paths["stock_master"])
-        logging.info("Rebuilt stock master with %s symbols", len(master_df))
+        master_df = build_stock_master_from_excel(args.master_source, paths["stock_master"], force=args.force_master)
+        if master_df.attrs.get("rebuilt"):
+            master_meta = load_master_meta(paths["stock_master"])
+            logging.info(
+                "Rebuilt stock master with %s symbols (added %s, removed %s)",
+                len(master_df),
+                len(master_meta.get("added", [])),
+                len(master_meta.get("removed", [])),
+            )
+        else:
+            logging.info("Stock master source unchanged, kept %s symbols", len(master_df))
         if not Path(paths["stock_master"]).exists():
             raise FileNotFoundError(f"Stock master was not created: {paths['stock_master']}")
         secrets_path = Path(args.secrets) if args.secrets else Path("secrets.json")
@@ -85,89 +533,122 @@ def main() -> None:
             logging.info("Master rebuild only completed. secrets.json not found, skipping API batch run.")
             return
 
-    secrets = load_secrets(args.secrets)
+    if args.merge_shards:
+        merge_shards(paths, runtime, validation_config, args.date or datetime.now().strftime("%Y%m%d"), args.merge_shards)
+        return
 
+    shard = parse_shard(args.shard) if args.shard else None
     master = load_stock_master(paths["stock_master"])
     logging.info("Loaded %s enabled symbols", len(master))
+    calendar = load_trading_calendar(paths.get("holiday_file"))
+
+    if args.scan_quality:
+        run_quality_scan(paths, runtime, master, calendar, args.date or datetime.now().strftime("%Y%m%d"))
+        return
+
+    run_at_dt = datetime.now()
+    if args.date:
+        run_at_dt = datetime.combine(datetime.strptime(args.date, "%Y%m%d").date(), run_at_dt.time())
+    end_date = run_at_dt.strftime("%Y%m%d")
+
+    http_cache = None
+    if args.http_cache != "passthrough":
+        http_cache = HttpCache(paths["http_cache"], args.http_cache, as_of=end_date)
+        logging.info("HTTP cache %s for %s in %s", args.http_cache, end_date, paths["http_cache"])
+    if args.http_cache == "record":
+        evicted = evict_http_cache(
+            paths["http_cache"],
+            max_bytes=int(runtime.get("http_cache_max_mb", 512) * 1024 * 1024),
+            max_age_days=runtime.get("http_cache_max_age_days"),
+        )
+        if evicted:
+            logging.info("Evicted %s cached responses", evicted)
+    if args.http_cache == "replay":
+        # Replayed responses come from disk, so neither credentials nor request pacing are needed.
+        secrets = {"app_key": "replay", "app_secret": "replay"}
+        runtime = {**runtime, "request_sleep_sec": 0}
+    else:
+        secrets = load_secrets(args.secrets)
 
     auth = KisAuth(
         app_key=secrets["app_key"],
         app_secret=secrets["app_secret"],
         base_url=config["kis"]["base_url"],
+        cache=http_cache,
     )
-    access_token = issue_access_token(auth)
 
-    run_at_dt = datetime.now()
-    end_date_dt = run_at_dt
-    end_date = end_date_dt.strftime("%Y%m%d")
     thresholds = SignalThresholds(
         signal_threshold=runtime["signal_threshold"],
         strong_threshold=runtime["strong_threshold"],
         min_volume=runtime["min_volume"],
     )
 
+    if args.rescore:
+        run_rescore(args, paths, runtime, master, calendar, auth, thresholds, run_at_dt)
+        return
+
     logging.info("Run timestamp: %s", run_at_dt.isoformat(timespec="seconds"))
     logging.info("Target date: %s", end_date)
 
-    patch_rows = []
-    signal_rows = []
-
-    for stock in master.itertuples(index=False):
-        raw_path = Path(paths["raw_dir"]) / f"{stock.symbol}.csv"
-        start_date = resolve_fetch_start_date(raw_path, runtime, end_date_dt)
-        latest_stored = get_latest_history_date(raw_path)
-        logging.info(
-            "Fetching %s %s from %s to %s (latest stored: %s)",
-            stock.symbol,
-            stock.name,
-            start_date,
-            end_date,
-            latest_stored or "none",
-        )
-        history = fetch_daily_history(auth, access_token, stock.symbol, start_date, end_date)
-        throttle(runtime["request_sleep_sec"])
-        if history.empty:
-            logging.warning("No history for %s", stock.symbol)
-            continue
-
-        history["symbol"] = stock.symbol
-        history["name"] = stock.name
+    if shard:
+        shard_index, shard_count = shard
+        master = select_shard(master, shard_index, shard_count)
+        logging.info("Shard %s/%s owns %s symbols", shard_index, shard_count, len(master))
+
+    pending_backfill = set(load_master_meta(paths["stock_master"]).get("pending_backfill", []))
+    if pending_backfill:
+        logging.info("Backfilling %s newly added symbols", len(pending_backfill))
+
+    repair_plan = load_repair_plan(Path(paths["quality_dir"]) / "repair_plan.csv")
+    plan = plan_fetches(
+        master,
+        paths["raw_dir"],
+        calendar,
+        end_date,
+        runtime["history_lookback_days"],
+        pending_backfill,
+        repair_plan,
+        runtime.get("incremental_recheck_days", 0),
+    )
+    logging.info(
+        "Fetch plan through %s: %s symbols to fetch in %s date windows, %s already complete, %s repairs",
+        plan.last_session,
+        len(plan.tasks),
+        len(plan.windows()),
+        len(plan.up_to_date),
+        len(plan.repairs),
+    )
+    published_session = load_latest_patch_session(paths["patch_dir"])
+    if not calendar.is_session(end_date) and published_session and published_session >= plan.last_session:
+        # Halted or delisted symbols always plan a fetch, so the plan alone never looks complete on a holiday.
+        logging.info("%s is not a KRX session and %s is already published. Nothing to do.", end_date, plan.last_session)
+        if shard:
+            save_shard_manifest(
+                shard_manifest_path(paths["patch_dir"], end_date, *shard),
+                {"date": end_date, "shard": shard_label(*shard), "skipped": True},
+            )
+        return
 
-        latest_row = history.iloc[[-1]].copy()
-        latest_row["fetched_at"] = run_at_dt.isoformat(timespec="seconds")
-        latest_row["analysis_date"] = end_date
-        patch_rows.append(latest_row)
+    access_token = issue_access_token(auth) if plan.api_tasks else None
+    repaired, known_gaps = run_repairs(paths, runtime, plan, calendar, auth, access_token)
 
-        merged = merge_and_save_history(raw_path, history.drop(columns=["symbol", "name"]))
-        signal = score_symbol(merged, stock.symbol, stock.name, thresholds)
-        if signal:
-            signal_rows.append(signal)
+    patch_df, signals_df, histories, backfilled = run_batch(
+        paths, runtime, master, plan, calendar, auth, access_token, thresholds, run_at_dt
+    )
 
-    if not patch_rows:
-        logging.warning("No daily rows collected.")
+    if shard:
+        save_shard_outputs(paths, end_date, shard, patch_df, signals_df, histories, backfilled, repaired, known_gaps)
         return
 
-    patch_df = pd.concat(patch_rows, ignore_index=True)
-    latest_date = end_date
-    save_daily_patch(Path(paths["patch_dir"]) / f"{latest_date}_prices.csv", patch_df)
+    apply_repair_results(paths, repaired, known_gaps)
 
-    signals_df = pd.DataFrame(signal_rows)
-    if signals_df.empty:
-        logging.warning("No signals calculated.")
+    if patch_df.empty:
+        logging.warning("No daily rows collected.")
         return
-    signals_df["analysis_date"] = end_date
-    signals_df["run_at"] = run_at_dt.isoformat(timespec="seconds")
-    save_daily_signals(Path(paths["signal_dir"]) / f"{latest_date}_signals.csv", signals_df)
-
-    all_signals_df = load_all_signal_files(paths["signal_dir"])
-    new_validation = build_validation_rows(all_signals_df, paths["raw_dir"], validation_config["forward_days"])
-    validation_path = Path(paths["validation_file"])
-    validation_all = new_validation.drop_duplicates(subset=["signal_date", "symbol"]).sort_values(["signal_date", "symbol"])
-    save_validation_history(validation_path, validation_all)
 
-    logging.info("Saved patch rows: %s", len(patch_df))
-    logging.info("Saved signals: %s", len(signals_df))
-    logging.info("Validation rows rebuilt: %s", len(new_validation))
+    save_history_cache(Path(paths["history_cache"]), histories)
+    mark_backfilled(paths["stock_master"], backfilled)
+    publish_outputs(paths, validation_config, end_date, patch_df, signals_df, runtime.get("archive_after_days", 0))
 
 
 if __name__ == "__main__":
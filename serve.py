@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from src.knee_shoulder.config import load_config
+from src.knee_shoulder.signal_store import ROLLUP_DIMENSIONS, SIDES, open_signal_store, query_rollups
+from src.knee_shoulder.storage import load_existing_history, load_publish_manifest, load_validation_history
+from src.knee_shoulder.views import (
+    CANDIDATE_DISPLAY_MIN_SCORE,
+    load_latest_signals,
+    select_candidates,
+    select_recent_validation,
+)
+
+
+GZIP_MIN_BYTES = 1024
+RESPONSE_CACHE_SIZE = 4096
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class Snapshot:
+    version: str
+    date: str | None
+    manifest: dict
+    signals: pd.DataFrame
+    validation: pd.DataFrame
+    rollups: dict[tuple[str, str], pd.DataFrame]
+    histories: dict[str, pd.DataFrame]
+    loaded_at: str
+    responses: dict = field(default_factory=dict)
+
+
+@dataclass
+class Response:
+    status: int
+    body: bytes
+    etag: str
+    gzipped: bytes | None = None
+
+
+def _records(frame: pd.DataFrame) -> list[dict]:
+    return frame.astype(object).where(frame.notna(), None).to_dict(orient="records")
+
+
+def snapshot_signature(paths: dict) -> tuple:
+    # run_daily rewrites the manifest only after every output is in place, so it normally decides alone.
+    # Outputs newer than it arrived without a local batch (e.g. a git pull next to an old, gitignored manifest);
+    # a publish still in progress can also match briefly, and its manifest write supersedes that reload.
+    outputs = [Path(paths["validation_file"]), *sorted(Path(paths["signal_dir"]).glob("*_signals.csv"))[-1:]]
+    watched = [(str(path), path.stat().st_mtime_ns) for path in outputs if path.exists()]
+    manifest = Path(paths["publish_manifest"])
+    if manifest.exists():
+        published = manifest.stat().st_mtime_ns
+        watched = [(str(manifest), published), *(entry for entry in watched if entry[1] > published)]
+    return tuple(watched)
+
+
+def load_rollups(signal_db: str) -> dict[tuple[str, str], pd.DataFrame]:
+    if not Path(signal_db).exists():
+        return {}
+    with closing(open_signal_store(signal_db, read_only=True)) as store:
+        return {(side, dimension): query_rollups(store, side, dimension) for side in SIDES for dimension in ROLLUP_DIMENSIONS}
+
+
+def load_snapshot(paths: dict, signature: tuple) -> Snapshot:
+    signals, signal_date = load_latest_signals(paths["signal_dir"])
+    validation = load_validation_history(Path(paths["validation_file"]))
+    rollups = load_rollups(paths["signal_db"])
+    histories = {}
+    for symbol in signals["symbol"] if not signals.empty else []:
+        history = load_existing_history(Path(paths["raw_dir"]) / f"{symbol}.csv")
+        histories[symbol] = history.sort_values("date").reset_index(drop=True)
+    return Snapshot(
+        version=hashlib.sha1(repr(signature).encode("utf-8")).hexdigest()[:16],
+        date=signal_date,
+        manifest=load_publish_manifest(Path(paths["publish_manifest"])),
+        signals=signals,
+        validation=validation,
+        rollups=rollups,
+        histories=histories,
+        loaded_at=time.strftime("%Y-%m-%dT%H:%M:%S"),
+    )
+
+
+def _param(query: dict, name: str, default: str | None = None) -> str | None:
+    values = query.get(name)
+    return values[-1] if values else default
+
+
+def _int_param(query: dict, name: str, default: int | None, minimum: int = 0, maximum: int | None = None) -> int | None:
+    value = _param(query, name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ApiError(400, f"{name} must be an integer") from None
+    if number < minimum or (maximum is not None and number > maximum):
+        raise ApiError(400, f"{name} must be between {minimum} and {maximum if maximum is not None else 'inf'}")
+    return number
+
+
+def _side(query: dict) -> str:
+    side = _param(query, "side", "knee")
+    if side not in SIDES:
+        raise ApiError(400, f"side must be one of {', '.join(SIDES)}")
+    return side
+
+
+class ApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address: tuple[str, int], config: dict) -> None:
+        super().__init__(address, ApiHandler)
+        self.paths = config["paths"]
+        self.serve_config = config.get("serve", {})
+        self.signature = snapshot_signature(self.paths)
+        self.snapshot = load_snapshot(self.paths, self.signature)
+
+    def reload_if_changed(self) -> bool:
+        signature = snapshot_signature(self.paths)
+        if signature == self.signature:
+            return False
+        snapshot = load_snapshot(self.paths, signature)
+        # Requests hold on to the snapshot they started with; swapping the reference is the whole reload.
+        self.snapshot, self.signature = snapshot, signature
+        return True
+
+    def watch(self, interval_sec: float) -> None:
+        while True:
+            time.sleep(interval_sec)
+            try:
+                if self.reload_if_changed():
+                    logging.info("Reloaded snapshot %s for %s", self.snapshot.version, self.snapshot.date)
+            except Exception:
+                logging.exception("Snapshot reload failed, still serving %s", self.snapshot.version)
+
+    def paginate(self, frame: pd.DataFrame, query: dict) -> dict:
+        page_size = _int_param(
+            query,
+            "page_size",
+            self.serve_config.get("default_page_size", 50),
+            minimum=1,
+            maximum=self.serve_config.get("max_page_size", 500),
+        )
+        page = _int_param(query, "page", 1, minimum=1)
+        start = (page - 1) * page_size
+        return {
+            "total": len(frame),
+            "page": page,
+            "page_size": page_size,
+            "pages": (len(frame) + page_size - 1) // page_size,
+            "items": _records(frame.iloc[start : start + page_size]),
+        }
+
+    def route(self, snapshot: Snapshot, path: str, query: dict) -> dict:
+        parts = [part for part in path.split("/") if part]
+        if parts == ["health"]:
+            return {"status": "ok", "version": snapshot.version, "date": snapshot.date, "loaded_at": snapshot.loaded_at}
+        if parts == ["manifest"]:
+            return {"version": snapshot.version, "date": snapshot.date, **snapshot.manifest}
+        if parts == ["candidates"]:
+            side = _side(query)
+            min_score = _int_param(query, "min_score", CANDIDATE_DISPLAY_MIN_SCORE, maximum=100)
+            if snapshot.signals.empty:
+                return {"date": snapshot.date, "side": side, **self.paginate(snapshot.signals, query)}
+            view = select_candidates(snapshot.signals, side, min_score, _param(query, "grade"))
+            return {"date": snapshot.date, "side": side, **self.paginate(view, query)}
+        if len(parts) == 2 and parts[0] == "series":
+            symbol = parts[1].zfill(6)
+            if symbol not in snapshot.histories:
+                raise ApiError(404, f"No series for {symbol} in the latest batch")
+            history = snapshot.histories[symbol]
+            since = _param(query, "since")
+            if since:
+                history = history[history["date"].astype(str) >= since]
+            signal = snapshot.signals[snapshot.signals["symbol"] == symbol]
+            return {"symbol": symbol, "signal": _records(signal)[0] if not signal.empty else None, "items": _records(history)}
+        if parts == ["validation"]:
+            view = snapshot.validation
+            if not view.empty and _param(query, "all") != "1":
+                view = select_recent_validation(view, snapshot.date or "")
+            symbol = _param(query, "symbol")
+            if symbol and not view.empty:
+                view = view[view["symbol"] == symbol.zfill(6)]
+            return {"date": snapshot.date, **self.paginate(view, query)}
+        if parts == ["stats"]:
+            side = _side(query)
+            dimension = _param(query, "dimension", "grade")
+            if dimension not in ROLLUP_DIMENSIONS:
+                raise ApiError(400, f"dimension must be one of {', '.join(ROLLUP_DIMENSIONS)}")
+            rollup = snapshot.rollups.get((side, dimension))
+            if rollup is None:
+                return {"side": side, "dimension": dimension, "items": []}
+            horizon = _int_param(query, "horizon", None, minimum=1)
+            if horizon is not None:
+                rollup = rollup[rollup["horizon"] == horizon]
+            return {"side": side, "dimension": dimension, "items": _records(rollup)}
+        raise ApiError(404, f"Unknown path {path}")
+
+    def respond(self, target: str) -> Response:
+        snapshot = self.snapshot
+        cached = snapshot.responses.get(target)
+        if cached is not None:
+            return cached
+        url = urlparse(target)
+        try:
+            status, payload = 200, self.route(snapshot, url.path, parse_qs(url.query))
+        except ApiError as error:
+            status, payload = error.status, {"error": str(error)}
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        response = Response(status, body, f'"{hashlib.sha1(body).hexdigest()[:20]}"')
+        if len(snapshot.responses) >= RESPONSE_CACHE_SIZE:
+            snapshot.responses.clear()
+        snapshot.responses[target] = response
+        return response
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Buffer headers and body into one write; separate small writes stall keep-alive clients on delayed ACKs.
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+    server: ApiServer
+
+    def do_GET(self) -> None:
+        self._send(include_body=True)
+
+    def do_HEAD(self) -> None:
+        self._send(include_body=False)
+
+    def _send(self, include_body: bool) -> None:
+        response = self.server.respond(self.path)
+        if response.status == 200 and self.headers.get("If-None-Match") == response.etag:
+            self.send_response(304)
+            self.send_header("ETag", response.etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = response.body
+        use_gzip = len(body) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", "")
+        if use_gzip:
+            if response.gzipped is None:
+                response.gzipped = gzip.compress(body, compresslevel=5)
+            body = response.gzipped
+        self.send_response(response.status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", response.etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        if include_body:
+            self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        logging.debug("%s - %s", self.address_string(), format % args)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve the latest batch outputs as a read-only JSON API.")
+    parser.add_argument("--config", default=None, help="Path to config.json")
+    parser.add_argument("--host", default=None, help="Bind address, defaults to serve.host")
+    parser.add_argument("--port", type=int, default=None, help="Port, defaults to serve.port")
+    parser.add_argument("--reload-interval", type=float, default=None, help="Seconds between checks for a new batch")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    config = load_config(args.config)
+    serve_config = config.get("serve", {})
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    host = args.host or serve_config.get("host", "127.0.0.1")
+    port = args.port if args.port is not None else serve_config.get("port", 8000)
+    server = ApiServer((host, port), config)
+    interval = args.reload_interval or serve_config.get("reload_interval_sec", 5)
+    threading.Thread(target=server.watch, args=(interval,), daemon=True).start()
+    logging.info("Serving snapshot %s for %s on http://%s:%s", server.snapshot.version, server.snapshot.date, host, port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from .storage import get_latest_history_date
+from .trading_calendar import TradingCalendar
+
+
+@dataclass
+class FetchTask:
+    symbol: str
+    name: str
+    start_date: str
+    end_date: str
+    latest_stored: str | None
+    backfill: bool = False
+    reason: str = ""
+
+
+@dataclass
+class FetchPlan:
+    last_session: str
+    tasks: list[FetchTask]
+    up_to_date: list[str]
+    repairs: list[FetchTask] = field(default_factory=list)
+
+    def windows(self) -> dict[tuple[str, str], list[str]]:
+        grouped = defaultdict(list)
+        for task in self.tasks:
+            grouped[(task.start_date, task.end_date)].append(task.symbol)
+        return dict(sorted(grouped.items()))
+
+    @property
+    def api_tasks(self) -> int:
+        return len(self.tasks) + len(self.repairs)
+
+
+def plan_fetches(
+    master: pd.DataFrame,
+    raw_dir: str,
+    calendar: TradingCalendar,
+    run_date: str,
+    lookback_days: int,
+    pending_backfill: set[str] | None = None,
+    repair_plan: pd.DataFrame | None = None,
+    recheck_sessions: int = 0,
+) -> FetchPlan:
+    pending_backfill = pending_backfill or set()
+    last_session = calendar.previous_session(run_date)
+    backfill_start = (datetime.strptime(run_date, "%Y%m%d") - timedelta(days=lookback_days)).strftime("%Y%m%d")
+
+    tasks = []
+    up_to_date = []
+    for stock in master.itertuples(index=False):
+        backfill = stock.symbol in pending_backfill
+        latest_stored = None if backfill else get_latest_history_date(Path(raw_dir) / f"{stock.symbol}.csv")
+        if latest_stored:
+            start_date = calendar.next_session(latest_stored)
+            if start_date > last_session:
+                up_to_date.append(stock.symbol)
+                continue
+            if recheck_sessions > 0:
+                # Refetch the last few stored sessions too so adjusted-price changes show up as overlap mismatches.
+                start_date = calendar.shift_sessions(latest_stored, -(recheck_sessions - 1))
+        else:
+            start_date = backfill_start
+        tasks.append(FetchTask(stock.symbol, stock.name, start_date, last_session, latest_stored, backfill))
+
+    repairs = []
+    if repair_plan is not None and not repair_plan.empty:
+        names = dict(zip(master["symbol"], master["name"]))
+        for row in repair_plan[repair_plan["symbol"].isin(names)].itertuples(index=False):
+            repairs.append(
+                FetchTask(row.symbol, names[row.symbol], row.start_date, row.end_date, None, reason=row.reason)
+            )
+    return FetchPlan(last_session=last_session, tasks=tasks, up_to_date=up_to_date, repairs=repairs)
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import urlparse
+
+
+CACHE_MODES = ("passthrough", "record", "replay")
+
+
+class HttpCacheMiss(LookupError):
+    pass
+
+
+@dataclass
+class HttpCache:
+    """On-disk store of KIS JSON responses, one gzip file per request.
+
+    ``record`` calls the API and saves every response, ``replay`` serves only saved responses and never
+    touches the network, ``passthrough`` calls the API without reading or writing the cache.
+    """
+
+    root: Path
+    mode: str = "passthrough"
+    as_of: str = ""
+
+    def __post_init__(self) -> None:
+        if self.mode not in CACHE_MODES:
+            raise ValueError(f"HTTP cache mode must be one of {CACHE_MODES}, got {self.mode!r}")
+        self.root = Path(self.root)
+
+    def key(self, method: str, url: str, tr_id: str, params: dict | None) -> str:
+        # The base URL, token and app keys are left out so live and stub recordings share keys and no secret is stored.
+        request = {
+            "method": method,
+            "path": urlparse(url).path,
+            "tr_id": tr_id,
+            "params": dict(sorted((params or {}).items())),
+            "as_of": self.as_of,
+        }
+        return hashlib.sha256(json.dumps(request, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> Path:
+        return self.root / (self.as_of or "undated") / key[:2] / f"{key}.json.gz"
+
+    def load(self, key: str) -> dict:
+        path = self.path_for(key)
+        if not path.exists():
+            raise HttpCacheMiss(f"No recorded response for {key} (as of {self.as_of or 'undated'}) in {self.root}")
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            return json.load(file)["response"]
+
+    def save(self, key: str, request: dict, response: dict) -> None:
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Shards record concurrently, so each writer goes through its own temp file.
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as file:
+            json.dump({"request": request, "response": response}, file, ensure_ascii=False)
+        tmp_path.replace(path)
+
+
+def evict_http_cache(root: str | Path, max_bytes: int | None = None, max_age_days: float | None = None) -> int:
+    """Remove entries older than ``max_age_days``, then the oldest ones until the cache fits in ``max_bytes``."""
+    entries = []
+    for path in Path(root).rglob("*.json.gz"):
+        stat = path.stat()
+        entries.append((stat.st_mtime, stat.st_size, path))
+    entries.sort()
+
+    removed = 0
+    total = sum(size for _, size, _ in entries)
+    cutoff = time.time() - max_age_days * 86400 if max_age_days else None
+    for mtime, size, path in entries:
+        expired = cutoff is not None and mtime < cutoff
+        oversized = max_bytes is not None and total > max_bytes
+        if not expired and not oversized:
+            break
+        path.unlink()
+        total -= size
+        removed += 1
+    return removed
@@ -33,4 +33,12 @@ def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
     frame["macd"] = ema_12 - ema_26
     frame["macd_signal"] = frame["macd"].ewm(span=9, adjust=False).mean()
     frame["macd_hist"] = frame["macd"] - frame["macd_signal"]
+
+    for investor in ("foreign", "institution"):
+        column = f"{investor}_net_qty"
+        if column in frame.columns:
+            net_qty = pd.to_numeric(frame[column], errors="coerce").astype(float)
+            # Flow is missing before collection started, so a window with any gap stays NaN instead of a partial sum.
+            frame[f"{investor}_net_qty_5"] = net_qty.rolling(5).sum()
+            frame[f"{investor}_net_qty_20"] = net_qty.rolling(20).sum()
     return frame
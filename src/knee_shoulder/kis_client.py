@@ -4,7 +4,23 @@ import time
 from dataclasses import dataclass
 
 import pandas as pd
-import requests
+
+from .http_cache import HttpCache
+
+
+# inquire-daily-itemchartprice returns at most this many bars per request.
+KIS_MAX_DAILY_ROWS = 100
+# Replayed runs never call tokenP; data requests only need a placeholder bearer token.
+REPLAY_ACCESS_TOKEN = "replay"
+
+INVESTOR_FLOW_FIELDS = {
+    "foreign_net_qty": "frgn_ntby_qty",
+    "foreign_net_amount": "frgn_ntby_tr_pbmn",
+    "institution_net_qty": "orgn_ntby_qty",
+    "institution_net_amount": "orgn_ntby_tr_pbmn",
+    "individual_net_qty": "prsn_ntby_qty",
+    "individual_net_amount": "prsn_ntby_tr_pbmn",
+}
 
 
 @dataclass
@@ -12,9 +28,12 @@ class KisAuth:
     app_key: str
     app_secret: str
     base_url: str
+    cache: HttpCache | None = None
 
 
 def issue_access_token(auth: KisAuth) -> str:
+    if auth.cache is not None and auth.cache.mode == "replay":
+        return REPLAY_ACCESS_TOKEN
     url = f"{auth.base_url}/oauth2/tokenP"
     payload = {
         "grant_type": "client_credentials",
@@ -26,15 +45,30 @@ def issue_access_token(auth: KisAuth) -> str:
         "appKey": auth.app_key,
         "appSecret": auth.app_secret,
     }
-    response = requests.post(url, headers=headers, json=payload, timeout=15)
-    response.raise_for_status()
-    data = response.json()
+    data = _send("POST", url, headers=headers, json=payload, timeout=15)
     token = data.get("access_token")
     if not token:
         raise ValueError("KIS token response did not include access_token")
     return token
 
 
+def _send(method: str, url: str, cache: HttpCache | None = None, **kwargs) -> dict:
+    if cache is not None and cache.mode != "passthrough":
+        tr_id = kwargs.get("headers", {}).get("tr_id", "")
+        key = cache.key(method, url, tr_id, kwargs.get("params"))
+        if cache.mode == "replay":
+            return cache.load(key)
+
+    import requests
+
+    response = requests.request(method, url, **kwargs)
+    response.raise_for_status()
+    data = response.json()
+    if cache is not None and cache.mode == "record":
+        cache.save(key, {"method": method, "url": url, "tr_id": tr_id, "params": kwargs.get("params")}, data)
+    return data
+
+
 def _base_headers(auth: KisAuth, access_token: str, tr_id: str) -> dict:
     return {
         "content-type": "application/json; charset=utf-8",
@@ -63,14 +97,14 @@ def fetch_daily_history(
         "FID_INPUT_DATE_2": end_date,
         "FID_COMP_ICD": symbol,
     }
-    response = requests.get(
+    data = _send(
+        "GET",
         url,
+        cache=auth.cache,
         headers=_base_headers(auth, access_token, "FHKST03010100"),
         params=params,
         timeout=20,
     )
-    response.raise_for_status()
-    data = response.json()
     rows = data.get("output2") or []
     records = []
     for item in rows:
@@ -92,6 +126,31 @@ def fetch_daily_history(
     return frame
 
 
+def fetch_current_price(auth: KisAuth, access_token: str, symbol: str) -> dict:
+    url = f"{auth.base_url}/uapi/domestic-stock/v1/quotations/inquire-price"
+    params = {
+        "FID_COND_MRKT_DIV_CODE": "J",
+        "FID_INPUT_ISCD": symbol,
+    }
+    data = _send(
+        "GET",
+        url,
+        cache=auth.cache,
+        headers=_base_headers(auth, access_token, "FHKST01010100"),
+        params=params,
+        timeout=20,
+    )
+    item = data.get("output") or {}
+    return {
+        "open": int(item.get("stck_oprc", "0") or 0),
+        "high": int(item.get("stck_hgpr", "0") or 0),
+        "low": int(item.get("stck_lwpr", "0") or 0),
+        "close": int(item.get("stck_prpr", "0") or 0),
+        "volume": int(item.get("acml_vol", "0") or 0),
+        "turnover": int(item.get("acml_tr_pbmn", "0") or 0),
+    }
+
+
 def fetch_investor_trade_by_stock_daily(
     auth: KisAuth,
     access_token: str,
@@ -103,22 +162,30 @@ def fetch_investor_trade_by_stock_daily(
     params = {
         "FID_COND_MRKT_DIV_CODE": "J",
         "FID_INPUT_ISCD": symbol,
-        "FID_INPUT_DATE_1": start_date,
-        "FID_INPUT_DATE_2": end_date,
-        "FID_PERIOD_DIV_CODE": "D",
+        "FID_INPUT_DATE_1": end_date,
+        "FID_ORG_ADJ_PRC": "",
+        "FID_ETC_CLS_CODE": "",
     }
-    response = requests.get(
+    data = _send(
+        "GET",
         url,
-        headers=_base_headers(auth, access_token, "FHKST66300000"),
+        cache=auth.cache,
+        headers=_base_headers(auth, access_token, "FHPTJ04160001"),
         params=params,
         timeout=20,
     )
-    response.raise_for_status()
-    data = response.json()
-    rows = data.get("output") or data.get("output1") or []
-    if not rows:
-        return pd.DataFrame()
-    frame = pd.DataFrame(rows)
+    rows = data.get("output2") or data.get("output") or []
+    records = []
+    for item in rows:
+        record = {"date": item.get("stck_bsop_date", "")}
+        for column, field in INVESTOR_FLOW_FIELDS.items():
+            record[column] = int(item.get(field, "0") or 0)
+        records.append(record)
+    frame = pd.DataFrame.from_records(records, columns=["date", *INVESTOR_FLOW_FIELDS])
+    if frame.empty:
+        return frame
+    frame = frame[(frame["date"] >= start_date) & (frame["date"] <= end_date)]
+    frame = frame.sort_values("date").drop_duplicates(subset=["date"]).reset_index(drop=True)
     return frame
 
 
@@ -1,24 +1,76 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import os
+from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 
-import openpyxl
+import numpy as np
 import pandas as pd
 
 
-def build_stock_master_from_excel(source_path: str, output_path: str) -> pd.DataFrame:
+SYMBOL_WIDTH = 6
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def master_binary_path(path: str | Path) -> Path:
+    return Path(path).with_suffix(".npy")
+
+
+def master_meta_path(path: str | Path) -> Path:
+    return Path(path).with_suffix(".meta.json")
+
+
+def load_master_meta(path: str | Path) -> dict:
+    meta_path = master_meta_path(path)
+    if not meta_path.exists():
+        return {}
+    with meta_path.open("r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save_master_meta(path: str | Path, meta: dict) -> None:
+    with master_meta_path(path).open("w", encoding="utf-8") as file:
+        json.dump(meta, file, ensure_ascii=False, indent=2)
+
+
+def diff_stock_master(previous: pd.DataFrame, current: pd.DataFrame) -> tuple[list[str], list[str]]:
+    previous_symbols = set(previous["symbol"]) if not previous.empty else set()
+    current_symbols = set(current["symbol"])
+    return sorted(current_symbols - previous_symbols), sorted(previous_symbols - current_symbols)
+
+
+def build_stock_master_from_excel(source_path: str, output_path: str, force: bool = False) -> pd.DataFrame:
     source = Path(source_path)
     output = Path(output_path)
     output.parent.mkdir(parents=True, exist_ok=True)
 
+    source_hash = file_sha256(source)
+    meta = load_master_meta(output)
+    if not force and meta.get("source_hash") == source_hash and output.exists():
+        df = load_stock_master(str(output), enabled_only=False)
+        df.attrs["rebuilt"] = False
+        return df
+
+    import openpyxl
+
     wb = openpyxl.load_workbook(source, read_only=True, data_only=True)
     ws = wb["종목"]
 
     rows = []
-    for name, code in ws.iter_rows(min_row=2, values_only=True):
+    for name, code in ws.iter_rows(min_row=2, max_col=2, values_only=True):
         if not name or not code:
             continue
-        symbol = str(code).strip().zfill(6)
+        symbol = str(code).strip().zfill(SYMBOL_WIDTH)
         rows.append(
             {
                 "symbol": symbol,
@@ -28,15 +80,105 @@ def build_stock_master_from_excel(source_path: str, output_path: str) -> pd.Data
                 "source_file": str(source),
             }
         )
+    wb.close()
+
+    df = pd.DataFrame(rows).drop_duplicates(subset=["symbol"]).sort_values("symbol").reset_index(drop=True)
+    # A first build has nothing to diff against; the regular lookback fetch already covers every symbol.
+    added, removed = [], []
+    if output.exists():
+        added, removed = diff_stock_master(load_stock_master(str(output), enabled_only=False), df)
 
-    df = pd.DataFrame(rows).drop_duplicates(subset=["symbol"]).sort_values("symbol")
     df.to_csv(output, index=False, encoding="utf-8-sig")
+    save_master_binary(output, df)
+    pending = set(meta.get("pending_backfill", [])) - set(removed)
+    save_master_meta(
+        output,
+        {
+            "source_file": str(source),
+            "source_hash": source_hash,
+            "built_at": datetime.now().isoformat(timespec="seconds"),
+            "added": added,
+            "removed": removed,
+            "pending_backfill": sorted(pending | set(added)),
+        },
+    )
+    df.attrs["rebuilt"] = True
     return df
 
 
-def load_stock_master(path: str) -> pd.DataFrame:
+def save_master_binary(path: str | Path, df: pd.DataFrame) -> None:
+    name_width = max(int(df["name"].astype(str).str.len().max() or 1), 1)
+    records = np.zeros(
+        len(df),
+        dtype=[
+            ("symbol", f"S{SYMBOL_WIDTH}"),
+            ("name", f"U{name_width}"),
+            ("market", "U8"),
+            ("enabled", "i1"),
+        ],
+    )
+    records["symbol"] = df["symbol"].astype(str).str.zfill(SYMBOL_WIDTH).str.encode("ascii").to_numpy()
+    records["name"] = df["name"].astype(str).to_numpy()
+    records["market"] = df["market"].astype(str).to_numpy() if "market" in df.columns else "KR"
+    records["enabled"] = df["enabled"].fillna(1).astype(int).to_numpy() if "enabled" in df.columns else 1
+    records.sort(order="symbol")
+    binary_path = master_binary_path(path)
+    # Concurrent shard processes may rebuild the same binary; give each its own temp file.
+    tmp_path = binary_path.with_suffix(f".{os.getpid()}.tmp.npy")
+    np.save(tmp_path, records, allow_pickle=False)
+    tmp_path.replace(binary_path)
+
+
+@lru_cache(maxsize=4)
+def _load_master_records(path: str, csv_mtime_ns: int) -> np.ndarray:
+    binary_path = master_binary_path(path)
+    if binary_path.exists() and binary_path.stat().st_mtime_ns >= csv_mtime_ns:
+        return np.load(binary_path, allow_pickle=False)
+
     df = pd.read_csv(path, dtype={"symbol": str})
-    df["symbol"] = df["symbol"].str.zfill(6)
-    if "enabled" in df.columns:
-        df = df[df["enabled"].fillna(1).astype(int) == 1]
+    df["symbol"] = df["symbol"].str.zfill(SYMBOL_WIDTH)
+    save_master_binary(path, df)
+    return np.load(binary_path, allow_pickle=False)
+
+
+def load_master_records(path: str) -> np.ndarray:
+    return _load_master_records(str(Path(path)), Path(path).stat().st_mtime_ns)
+
+
+def lookup_symbol(path: str, symbol: str) -> dict | None:
+    records = load_master_records(path)
+    key = symbol.strip().zfill(SYMBOL_WIDTH).encode("ascii")
+    row = int(np.searchsorted(records["symbol"], key))
+    if row >= len(records) or records["symbol"][row] != key:
+        return None
+    record = records[row]
+    return {
+        "symbol": record["symbol"].decode("ascii"),
+        "name": str(record["name"]),
+        "market": str(record["market"]),
+        "enabled": int(record["enabled"]),
+    }
+
+
+def load_stock_master(path: str, enabled_only: bool = True) -> pd.DataFrame:
+    records = load_master_records(path)
+    df = pd.DataFrame(
+        {
+            "symbol": np.char.decode(records["symbol"], "ascii"),
+            "name": records["name"],
+            "market": records["market"],
+            "enabled": records["enabled"].astype(int),
+        }
+    )
+    if enabled_only:
+        df = df[df["enabled"] == 1]
     return df.reset_index(drop=True)
+
+
+def mark_backfilled(path: str, symbols: list[str]) -> None:
+    meta = load_master_meta(path)
+    pending = meta.get("pending_backfill")
+    if not pending:
+        return
+    meta["pending_backfill"] = sorted(set(pending) - set(symbols))
+    save_master_meta(path, meta)
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+
+from .storage import load_existing_history
+from .trading_calendar import TradingCalendar
+
+
+PRICE_COLUMNS = ["open", "high", "low", "close"]
+ISSUE_COLUMNS = ["symbol", "issue", "date", "detail"]
+REPAIR_COLUMNS = ["symbol", "start_date", "end_date", "reason"]
+
+
+def load_history_panel(raw_dir: str, symbols: list[str]) -> pd.DataFrame:
+    frames = []
+    for symbol in symbols:
+        history = load_existing_history(Path(raw_dir) / f"{symbol}.csv")
+        if history.empty:
+            continue
+        frames.append(history.assign(symbol=symbol))
+    if not frames:
+        return pd.DataFrame(columns=["symbol", "date", *PRICE_COLUMNS])
+    panel = pd.concat(frames, ignore_index=True)
+    panel["date"] = panel["date"].astype(str)
+    return panel
+
+
+def load_known_gaps(path: Path) -> pd.DataFrame:
+    if not path.exists():
+        return pd.DataFrame(columns=["symbol", "date"])
+    return pd.read_csv(path, dtype={"symbol": str, "date": str})
+
+
+def save_known_gaps(path: Path, gaps: pd.DataFrame) -> None:
+    if gaps.empty:
+        return
+    combined = pd.concat([load_known_gaps(path), gaps[["symbol", "date"]]], ignore_index=True)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    combined.drop_duplicates().sort_values(["symbol", "date"]).to_csv(path, index=False, encoding="utf-8-sig")
+
+
+def _issues(frame: pd.DataFrame, issue: str, detail: pd.Series | str) -> pd.DataFrame:
+    return pd.DataFrame({"symbol": frame["symbol"], "issue": issue, "date": frame["date"], "detail": detail})
+
+
+def scan_history_quality(
+    panel: pd.DataFrame,
+    calendar: TradingCalendar,
+    last_session: str,
+    stale_sessions: int,
+    known_gaps: pd.DataFrame | None = None,
+) -> pd.DataFrame:
+    if panel.empty:
+        return pd.DataFrame(columns=ISSUE_COLUMNS)
+    found = []
+
+    prices = panel[PRICE_COLUMNS].apply(pd.to_numeric, errors="coerce")
+    bad_bar = prices.isna() | (prices <= 0)
+    bad_rows = bad_bar.any(axis=1)
+    if bad_rows.any():
+        detail = bad_bar[bad_rows].apply(lambda row: ",".join(row.index[row]), axis=1)
+        found.append(_issues(panel[bad_rows], "bad_bar", detail))
+
+    previous_date = panel.groupby("symbol")["date"].shift()
+    out_of_order = previous_date.notna() & (panel["date"] < previous_date)
+    if out_of_order.any():
+        found.append(_issues(panel[out_of_order], "non_monotonic", "date before previous row"))
+
+    duplicated = panel.duplicated(subset=["symbol", "date"], keep="first")
+    if duplicated.any():
+        found.append(_issues(panel[duplicated], "duplicate_date", "repeated date"))
+
+    bounds = panel.groupby("symbol")["date"].agg(first="min", last="max").reset_index()
+    # Holidays are only known from the first year in the holiday file onward.
+    scan_start = bounds["first"].min()
+    if calendar.holidays:
+        scan_start = max(scan_start, f"{min(calendar.holidays)[:4]}0101")
+    sessions = pd.DataFrame({"date": calendar.sessions(scan_start, last_session)})
+    expected = bounds.merge(sessions, how="cross")
+    expected = expected[(expected["date"] >= expected["first"]) & (expected["date"] <= expected["last"])]
+    stored = panel[["symbol", "date"]].drop_duplicates()
+    missing = expected.merge(stored, on=["symbol", "date"], how="left", indicator=True)
+    missing = missing[missing["_merge"] == "left_only"]
+    if known_gaps is not None and not known_gaps.empty:
+        missing = missing.merge(known_gaps, on=["symbol", "date"], how="left", indicator="known")
+        missing = missing[missing["known"] == "left_only"]
+    if not missing.empty:
+        found.append(_issues(missing, "missing_session", "no bar for KRX session"))
+
+    behind = bounds["last"].map(lambda date: calendar.session_count(date, last_session) if date < last_session else 0)
+    stale = bounds[behind > stale_sessions]
+    if not stale.empty:
+        found.append(
+            pd.DataFrame(
+                {
+                    "symbol": stale["symbol"],
+                    "issue": "stale",
+                    "date": stale["last"],
+                    "detail": behind[behind > stale_sessions].map(lambda count: f"{count} sessions behind"),
+                }
+            )
+        )
+
+    if not found:
+        return pd.DataFrame(columns=ISSUE_COLUMNS)
+    return pd.concat(found, ignore_index=True).sort_values(["symbol", "date", "issue"]).reset_index(drop=True)
+
+
+def find_overlap_mismatches(stored: pd.DataFrame, incoming: pd.DataFrame, tolerance_pct: float) -> list[str]:
+    if stored.empty or incoming.empty:
+        return []
+    overlap = stored[["date", "close"]].merge(incoming[["date", "close"]], on="date", suffixes=("_stored", "_incoming"))
+    stored_close = pd.to_numeric(overlap["close_stored"], errors="coerce")
+    incoming_close = pd.to_numeric(overlap["close_incoming"], errors="coerce")
+    diff_pct = ((incoming_close - stored_close).abs() / stored_close.where(stored_close > 0)) * 100.0
+    return overlap.loc[diff_pct > tolerance_pct, "date"].astype(str).tolist()
+
+
+def build_repair_plan(
+    issues: pd.DataFrame,
+    calendar: TradingCalendar,
+    max_gap_sessions: int = 5,
+    max_window_sessions: int = 100,
+) -> pd.DataFrame:
+    # Stale symbols are caught up by the regular incremental fetch; everything else is refetched in place.
+    # Windows are capped because the daily chart endpoint returns at most 100 bars per request.
+    damaged = issues[issues["issue"] != "stale"]
+    if damaged.empty:
+        return pd.DataFrame(columns=REPAIR_COLUMNS)
+
+    rows = []
+    for symbol, group in damaged.groupby("symbol"):
+        dates = sorted(group["date"].unique())
+        reasons = set(group["issue"])
+        start = end = dates[0]
+        for date in dates[1:]:
+            if calendar.session_count(end, date) > max_gap_sessions or calendar.session_count(start, date) >= max_window_sessions:
+                rows.append({"symbol": symbol, "start_date": start, "end_date": end, "reason": "|".join(sorted(reasons))})
+                start = date
+            end = date
+        rows.append({"symbol": symbol, "start_date": start, "end_date": end, "reason": "|".join(sorted(reasons))})
+    return pd.DataFrame(rows, columns=REPAIR_COLUMNS)
+
+
+def load_repair_plan(path: Path) -> pd.DataFrame:
+    if not path.exists():
+        return pd.DataFrame(columns=REPAIR_COLUMNS)
+    return pd.read_csv(path, dtype={"symbol": str, "start_date": str, "end_date": str})
+
+
+def save_repair_plan(path: Path, plan: pd.DataFrame) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    plan.to_csv(path, index=False, encoding="utf-8-sig")
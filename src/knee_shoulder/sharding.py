@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import json
+import zlib
+from pathlib import Path
+
+import pandas as pd
+
+
+def parse_shard(text: str) -> tuple[int, int]:
+    index_text, _, count_text = text.partition("/")
+    if not index_text.isdigit() or not count_text.isdigit():
+        raise ValueError(f"--shard must look like i/N, got {text!r}")
+    index, count = int(index_text), int(count_text)
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"--shard index must be in [0, {count}), got {text!r}")
+    return index, count
+
+
+def shard_of(symbol: str, shard_count: int) -> int:
+    # crc32 is stable across processes and Python versions, unlike hash().
+    return zlib.crc32(symbol.encode("ascii")) % shard_count
+
+
+def select_shard(master: pd.DataFrame, shard_index: int, shard_count: int) -> pd.DataFrame:
+    mask = master["symbol"].map(lambda symbol: shard_of(symbol, shard_count) == shard_index)
+    return master[mask].reset_index(drop=True)
+
+
+def shard_label(shard_index: int, shard_count: int) -> str:
+    return f"{shard_index}of{shard_count}"
+
+
+def shard_output_path(directory: str, date: str, kind: str, shard_index: int, shard_count: int) -> Path:
+    return Path(directory) / "shards" / f"{date}_{kind}_{shard_label(shard_index, shard_count)}.csv"
+
+
+def shard_manifest_path(directory: str, date: str, shard_index: int, shard_count: int) -> Path:
+    return Path(directory) / "shards" / f"{date}_manifest_{shard_label(shard_index, shard_count)}.json"
+
+
+def shard_cache_path(path: str, shard_index: int, shard_count: int) -> Path:
+    cache_path = Path(path)
+    return cache_path.with_name(f"{cache_path.stem}_{shard_label(shard_index, shard_count)}{cache_path.suffix}")
+
+
+def save_shard_manifest(path: Path, manifest: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=2)
+
+
+def load_shard_manifests(directory: str, date: str, shard_count: int) -> list[dict]:
+    manifests = []
+    missing = []
+    for shard_index in range(shard_count):
+        path = shard_manifest_path(directory, date, shard_index, shard_count)
+        if not path.exists():
+            missing.append(shard_label(shard_index, shard_count))
+            continue
+        with path.open("r", encoding="utf-8") as file:
+            manifests.append(json.load(file))
+    if missing:
+        raise FileNotFoundError(f"Missing shard outputs for {date}: {', '.join(missing)}")
+    return manifests
+
+
+def load_shard_frames(directory: str, date: str, kind: str, shard_count: int) -> pd.DataFrame:
+    frames = []
+    for shard_index in range(shard_count):
+        path = shard_output_path(directory, date, kind, shard_index, shard_count)
+        if path.exists():
+            frames.append(pd.read_csv(path, dtype={"symbol": str, "date": str}))
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def remove_shard_outputs(directories: list[str], date: str, shard_count: int) -> None:
+    for directory in directories:
+        for path in (Path(directory) / "shards").glob(f"{date}_*_*of{shard_count}.*"):
+            path.unlink()
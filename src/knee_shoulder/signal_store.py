@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import math
+import sqlite3
+from pathlib import Path
+
+import pandas as pd
+
+from .storage import archive_files, load_archive_file
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signals (
+    date TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    name TEXT,
+    close INTEGER,
+    volume INTEGER,
+    turnover INTEGER,
+    pct_change REAL,
+    vol_ratio_20 REAL,
+    knee_score INTEGER,
+    knee_grade TEXT,
+    knee_reasons TEXT,
+    knee_confirmed INTEGER,
+    shoulder_score INTEGER,
+    shoulder_grade TEXT,
+    shoulder_reasons TEXT,
+    shoulder_confirmed INTEGER,
+    analysis_date TEXT,
+    run_at TEXT,
+    PRIMARY KEY (date, symbol)
+);
+CREATE INDEX IF NOT EXISTS idx_signals_symbol_date ON signals (symbol, date);
+CREATE INDEX IF NOT EXISTS idx_signals_knee ON signals (knee_score, date);
+CREATE INDEX IF NOT EXISTS idx_signals_shoulder ON signals (shoulder_score, date);
+CREATE INDEX IF NOT EXISTS idx_signals_knee_grade ON signals (knee_grade, date);
+CREATE INDEX IF NOT EXISTS idx_signals_shoulder_grade ON signals (shoulder_grade, date);
+
+CREATE TABLE IF NOT EXISTS validation (
+    signal_date TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    name TEXT,
+    knee_score INTEGER,
+    shoulder_score INTEGER,
+    knee_success INTEGER,
+    shoulder_success INTEGER,
+    PRIMARY KEY (signal_date, symbol)
+);
+CREATE INDEX IF NOT EXISTS idx_validation_symbol_date ON validation (symbol, signal_date);
+
+CREATE TABLE IF NOT EXISTS imported_files (
+    file_name TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS rollups (
+    side TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    horizon INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    successes INTEGER NOT NULL,
+    ret_sum REAL NOT NULL,
+    ret_sumsq REAL NOT NULL,
+    PRIMARY KEY (side, dimension, bucket, horizon)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_cells (
+    signal_date TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    horizon INTEGER NOT NULL,
+    PRIMARY KEY (signal_date, symbol, horizon)
+);
+"""
+SIDES = ("knee", "shoulder")
+ROLLUP_DIMENSIONS = ("all", "grade", "score_decile", "reason", "month")
+
+
+def open_signal_store(path: str, read_only: bool = False) -> sqlite3.Connection:
+    if read_only:
+        # Readers that must not write (the API server) skip the schema and every sync; whoever opens the
+        # store read-write (batch, dashboard, query tool) keeps it in step with the CSVs.
+        return sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _ensure_columns(conn: sqlite3.Connection, table: str, frame: pd.DataFrame) -> None:
+    # Optional columns (forward-return horizons, investor-flow sums) are added as they first appear.
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for column in frame.columns:
+        if column in existing:
+            continue
+        numeric = pd.api.types.is_numeric_dtype(frame[column]) or frame[column].isna().all()
+        kind = "REAL" if numeric else "TEXT"
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN "{column}" {kind}')
+
+
+def _upsert(conn: sqlite3.Connection, table: str, frame: pd.DataFrame) -> None:
+    if frame.empty:
+        return
+    _ensure_columns(conn, table, frame)
+    columns = ", ".join(f'"{column}"' for column in frame.columns)
+    placeholders = ", ".join("?" for _ in frame.columns)
+    values = frame.astype(object).where(frame.notna(), None).itertuples(index=False, name=None)
+    conn.executemany(f"INSERT OR REPLACE INTO {table} ({columns}) VALUES ({placeholders})", values)
+
+
+def sync_signal_files(conn: sqlite3.Connection, signal_dir: str, archive_dir: str | None = None) -> int:
+    imported = dict(conn.execute("SELECT file_name, mtime_ns FROM imported_files"))
+    count = 0
+    # Monthly archives first, so a daily file still on disk wins over an older archived copy of the same day.
+    archived = archive_files(archive_dir, "signals") if archive_dir else []
+    for file in [*archived, *sorted(Path(signal_dir).glob("*_signals.csv"))]:
+        mtime_ns = file.stat().st_mtime_ns
+        if imported.get(file.name) == mtime_ns:
+            continue
+        if file.suffix == ".parquet":
+            frame = load_archive_file(file)
+        else:
+            frame = pd.read_csv(file, dtype={"symbol": str, "date": str})
+        with conn:
+            _upsert(conn, "signals", frame)
+            conn.execute("INSERT OR REPLACE INTO imported_files VALUES (?, ?)", (file.name, mtime_ns))
+        count += 1
+    return count
+
+
+def sync_validation_file(conn: sqlite3.Connection, validation_file: str) -> bool:
+    path = Path(validation_file)
+    if not path.exists():
+        return False
+    mtime_ns = path.stat().st_mtime_ns
+    row = conn.execute("SELECT mtime_ns FROM imported_files WHERE file_name = ?", (path.name,)).fetchone()
+    if row and row[0] == mtime_ns:
+        return False
+    frame = pd.read_csv(path, dtype={"symbol": str, "signal_date": str})
+    with conn:
+        conn.execute("DELETE FROM validation")
+        _upsert(conn, "validation", frame)
+        conn.execute("INSERT OR REPLACE INTO imported_files VALUES (?, ?)", (path.name, mtime_ns))
+    return True
+
+
+def query_signals(
+    conn: sqlite3.Connection,
+    symbol: str | None = None,
+    side: str = "knee",
+    grade: str | None = None,
+    min_score: int | None = None,
+    since: str | None = None,
+    limit: int | None = None,
+) -> pd.DataFrame:
+    if side not in SIDES:
+        raise ValueError(f"side must be one of {SIDES}, got {side!r}")
+    clauses = []
+    params: list = []
+    if symbol:
+        clauses.append("symbol = ?")
+        params.append(symbol)
+    if grade:
+        clauses.append(f"{side}_grade = ?")
+        params.append(grade)
+    if min_score is not None:
+        clauses.append(f"{side}_score >= ?")
+        params.append(min_score)
+    if since:
+        clauses.append("date >= ?")
+        params.append(since)
+    sql = "SELECT * FROM signals"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += f" ORDER BY date DESC, {side}_score DESC"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return pd.read_sql_query(sql, conn, params=params, dtype={"symbol": str, "date": str})
+
+
+def query_validation(conn: sqlite3.Connection, symbol: str | None = None, since: str | None = None) -> pd.DataFrame:
+    clauses = []
+    params: list = []
+    if symbol:
+        clauses.append("symbol = ?")
+        params.append(symbol)
+    if since:
+        clauses.append("signal_date >= ?")
+        params.append(since)
+    sql = "SELECT * FROM validation"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY signal_date DESC, symbol"
+    return pd.read_sql_query(sql, conn, params=params, dtype={"symbol": str, "signal_date": str})
+
+
+def load_all_signals(conn: sqlite3.Connection) -> pd.DataFrame:
+    return pd.read_sql_query("SELECT * FROM signals ORDER BY date, symbol", conn, dtype={"symbol": str, "date": str})
+
+
+def _score_decile(score: pd.Series) -> pd.Series:
+    low = (pd.to_numeric(score, errors="coerce").fillna(0).clip(0, 99) // 10 * 10).astype(int)
+    return low.map(lambda value: f"{value:02d}-{value + 9 if value < 90 else 100:02d}")
+
+
+def _rollup_buckets(cells: pd.DataFrame, side: str) -> pd.DataFrame:
+    base = cells[["horizon", "ret", "success"]]
+    reasons = cells[f"{side}_reasons"].fillna("").str.split(" | ", regex=False).explode().str.strip()
+    reasons = reasons[reasons != ""]
+    frames = [
+        base.assign(dimension="all", bucket="all"),
+        base.assign(dimension="grade", bucket=cells[f"{side}_grade"].fillna("-")),
+        base.assign(dimension="score_decile", bucket=_score_decile(cells[f"{side}_score"])),
+        base.loc[reasons.index].assign(dimension="reason", bucket=reasons),
+        base.assign(dimension="month", bucket=cells["signal_date"].str[:6]),
+    ]
+    return pd.concat(frames, ignore_index=True).assign(side=side)
+
+
+def _pending_rollup_cells(conn: sqlite3.Connection, forward_days: list[int]) -> pd.DataFrame:
+    validation_columns = {row[1] for row in conn.execute("PRAGMA table_info(validation)")}
+    pending = []
+    for horizon in forward_days:
+        column = f"ret_{horizon}d"
+        if column not in validation_columns:
+            continue
+        pending.append(
+            pd.read_sql_query(
+                f"""
+                SELECT v.signal_date, v.symbol, {horizon} AS horizon, v."{column}" AS ret,
+                       s.knee_score, s.knee_grade, s.knee_reasons,
+                       s.shoulder_score, s.shoulder_grade, s.shoulder_reasons
+                FROM validation v
+                JOIN signals s ON s.date = v.signal_date AND s.symbol = v.symbol
+                LEFT JOIN rollup_cells c
+                    ON c.signal_date = v.signal_date AND c.symbol = v.symbol AND c.horizon = {horizon}
+                WHERE v."{column}" IS NOT NULL AND c.signal_date IS NULL
+                """,
+                conn,
+                dtype={"symbol": str, "signal_date": str},
+            )
+        )
+    return pd.concat(pending, ignore_index=True) if pending else pd.DataFrame()
+
+
+def _rollup_deltas(cells: pd.DataFrame, validation_config: dict) -> pd.DataFrame:
+    success_pct = {
+        "knee": validation_config.get("knee_success_return_pct", 3.0),
+        "shoulder": validation_config.get("shoulder_success_return_pct", -3.0),
+    }
+    buckets = []
+    for side in SIDES:
+        side_cells = cells.assign(
+            success=(cells["ret"] >= success_pct[side]) if side == "knee" else (cells["ret"] <= success_pct[side])
+        )
+        buckets.append(_rollup_buckets(side_cells, side))
+    return (
+        pd.concat(buckets, ignore_index=True)
+        .assign(ret_sq=lambda frame: frame["ret"] ** 2)
+        .groupby(["side", "dimension", "bucket", "horizon"], as_index=False)
+        .agg(count=("ret", "size"), successes=("success", "sum"), ret_sum=("ret", "sum"), ret_sumsq=("ret_sq", "sum"))
+    )
+
+
+def update_rollups(conn: sqlite3.Connection, validation_config: dict) -> int:
+    """Fold validation cells finalized since the last call into the rollup tables.
+
+    A cell is one (signal_date, symbol, horizon) whose forward return is known; each is applied exactly once.
+    """
+    with conn:
+        # Take the write lock before selecting, so concurrent callers cannot fold the same cells twice.
+        conn.execute("BEGIN IMMEDIATE")
+        cells = _pending_rollup_cells(conn, validation_config["forward_days"])
+        if cells.empty:
+            return 0
+        conn.executemany(
+            """
+            INSERT INTO rollups (side, dimension, bucket, horizon, count, successes, ret_sum, ret_sumsq)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (side, dimension, bucket, horizon) DO UPDATE SET
+                count = count + excluded.count,
+                successes = successes + excluded.successes,
+                ret_sum = ret_sum + excluded.ret_sum,
+                ret_sumsq = ret_sumsq + excluded.ret_sumsq
+            """,
+            _rollup_deltas(cells, validation_config).astype(object).itertuples(index=False, name=None),
+        )
+        conn.executemany(
+            "INSERT INTO rollup_cells VALUES (?, ?, ?)",
+            cells[["signal_date", "symbol", "horizon"]].astype(object).itertuples(index=False, name=None),
+        )
+    return len(cells)
+
+
+def query_rollups(
+    conn: sqlite3.Connection,
+    side: str = "knee",
+    dimension: str = "grade",
+    horizon: int | None = None,
+) -> pd.DataFrame:
+    if side not in SIDES:
+        raise ValueError(f"side must be one of {SIDES}, got {side!r}")
+    if dimension not in ROLLUP_DIMENSIONS:
+        raise ValueError(f"dimension must be one of {ROLLUP_DIMENSIONS}, got {dimension!r}")
+    sql = "SELECT bucket, horizon, count, successes, ret_sum, ret_sumsq FROM rollups WHERE side = ? AND dimension = ?"
+    params: list = [side, dimension]
+    if horizon is not None:
+        sql += " AND horizon = ?"
+        params.append(horizon)
+    frame = pd.read_sql_query(sql + " ORDER BY horizon, bucket", conn, params=params)
+    count = frame["count"]
+    frame["win_rate"] = (frame["successes"] / count * 100.0).round(1)
+    frame["mean_ret"] = (frame["ret_sum"] / count).round(2)
+    variance = (frame["ret_sumsq"] - frame["ret_sum"] ** 2 / count) / (count - 1).where(count > 1)
+    frame["std_ret"] = variance.clip(lower=0).map(lambda value: round(math.sqrt(value), 2) if pd.notna(value) else None)
+    return frame.drop(columns=["ret_sum", "ret_sumsq"])
@@ -81,7 +81,7 @@ def score_symbol(history: pd.DataFrame, symbol: str, name: str, thresholds: Sign
     shoulder_score = min(shoulder_score, 100)
     signal_date = str(latest["date"])
 
-    return {
+    signal = {
         "date": signal_date,
         "symbol": symbol,
         "name": name,
@@ -99,3 +99,7 @@ def score_symbol(history: pd.DataFrame, symbol: str, name: str, thresholds: Sign
         "shoulder_reasons": " | ".join(shoulder_reasons),
         "shoulder_confirmed": int(pd.notna(latest["ma_20"]) and latest["close"] <= latest["ma_20"] and prev["close"] > prev["ma_20"]),
     }
+    for column in ("foreign_net_qty_5", "institution_net_qty_5"):
+        if column in frame.columns:
+            signal[column] = int(latest[column]) if pd.notna(latest[column]) else None
+    return signal
@@ -1,9 +1,16 @@
 from __future__ import annotations
 
+import json
+from datetime import datetime, timedelta
 from pathlib import Path
 
 import pandas as pd
 
+from .kis_client import INVESTOR_FLOW_FIELDS
+
+
+INVESTOR_FLOW_COLUMNS = list(INVESTOR_FLOW_FIELDS)
+
 
 def ensure_directories(paths: list[str]) -> None:
     for path in paths:
@@ -17,29 +24,80 @@ def load_existing_history(path: Path) -> pd.DataFrame:
 
 
 def get_latest_history_date(path: Path) -> str | None:
-    history = load_existing_history(path)
-    if history.empty or "date" not in history.columns:
-        return None
-    dates = history["date"].dropna().astype(str)
-    if dates.empty:
+    # History files are written sorted by date, so the last line normally holds the latest bar.
+    if not path.exists():
         return None
-    return dates.max()
-
-
-def merge_and_save_history(path: Path, incoming: pd.DataFrame) -> pd.DataFrame:
+    with path.open("rb") as file:
+        file.seek(0, 2)
+        start = max(file.tell() - 4096, 0)
+        file.seek(start)
+        lines = file.read().splitlines()[1 if start else 0 :]
+    dates = [value for value in (line.split(b",", 1)[0].decode("utf-8-sig").strip() for line in lines) if value.isdigit()]
+    if dates == sorted(dates):
+        return dates[-1] if dates else None
+    # An out-of-order tail (reported as non_monotonic by --scan-quality) needs the real maximum. Disorder
+    # further up than the last 4 KB is not seen here; the scan's repair rewrites such files sorted.
+    latest = pd.read_csv(path, usecols=["date"], dtype={"date": str})["date"].dropna().max()
+    return None if pd.isna(latest) else latest
+
+
+def merge_and_save_history(path: Path, incoming: pd.DataFrame, prefer_incoming: bool = False) -> pd.DataFrame:
     current = load_existing_history(path)
-    combined = pd.concat([current, incoming], ignore_index=True)
-    combined = combined.drop_duplicates(subset=["date"]).sort_values("date").reset_index(drop=True)
+    parts = [incoming, current] if prefer_incoming else [current, incoming]
+    combined = pd.concat(parts, ignore_index=True)
+    # Keep the preferred bar per date, but fill columns it never had (e.g. investor flow) from the other.
+    combined = _cast_flow_columns(combined.groupby("date", as_index=False, sort=True).first())
     path.parent.mkdir(parents=True, exist_ok=True)
     combined.to_csv(path, index=False, encoding="utf-8-sig")
     return combined
 
 
+def _cast_flow_columns(frame: pd.DataFrame) -> pd.DataFrame:
+    for column in INVESTOR_FLOW_COLUMNS:
+        if column in frame.columns:
+            frame[column] = pd.to_numeric(frame[column], errors="coerce").astype("Int64")
+    return frame
+
+
+def replace_history(path: Path, incoming: pd.DataFrame) -> pd.DataFrame:
+    # Incoming bars fully replace stored prices; values the fetch did not return (e.g. investor flow
+    # outside the incremental window) are filled from the stored file for the same date.
+    current = load_existing_history(path)
+    replaced = incoming.sort_values("date").drop_duplicates(subset=["date"], keep="last").set_index("date")
+    stored = current.drop_duplicates(subset=["date"]).set_index("date").reindex(replaced.index)
+    for column in stored.columns:
+        if column not in replaced.columns:
+            replaced[column] = stored[column]
+        elif replaced[column].isna().any():
+            replaced[column] = replaced[column].fillna(stored[column])
+    replaced = _cast_flow_columns(replaced.reset_index())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    replaced.to_csv(tmp_path, index=False, encoding="utf-8-sig")
+    tmp_path.replace(path)
+    return replaced
+
+
+def attach_investor_flow(history: pd.DataFrame, flow: pd.DataFrame) -> pd.DataFrame:
+    if flow.empty:
+        return history
+    return history.merge(flow[["date", *INVESTOR_FLOW_COLUMNS]], on="date", how="left")
+
+
 def save_daily_patch(path: Path, frame: pd.DataFrame) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     frame.to_csv(path, index=False, encoding="utf-8-sig")
 
 
+def load_latest_patch_session(patch_dir: str) -> str | None:
+    # The newest daily patch holds the last session a batch published; archiving always keeps it on disk.
+    files = sorted(Path(patch_dir).glob("*_prices.csv"))
+    if not files:
+        return None
+    dates = pd.read_csv(files[-1], dtype={"date": str}, usecols=["date"])["date"].dropna()
+    return dates.max() if not dates.empty else None
+
+
 def save_daily_signals(path: Path, frame: pd.DataFrame) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     frame.sort_values(["knee_score", "shoulder_score"], ascending=False).to_csv(path, index=False, encoding="utf-8-sig")
@@ -56,10 +114,90 @@ def save_validation_history(path: Path, frame: pd.DataFrame) -> None:
     frame.to_csv(path, index=False, encoding="utf-8-sig")
 
 
-def load_all_signal_files(signal_dir: str) -> pd.DataFrame:
-    files = sorted(Path(signal_dir).glob("*_signals.csv"))
+def archive_files(archive_dir: str, kind: str) -> list[Path]:
+    return sorted((Path(archive_dir) / kind).glob(f"*_{kind}.parquet"))
+
+
+def load_archive_file(path: Path) -> pd.DataFrame:
+    frame = pd.read_parquet(path)
+    return frame.astype({"symbol": str, "date": str})
+
+
+def archive_daily_files(source_dir: str, archive_dir: str, kind: str, keep_days: int) -> list[str]:
+    """Roll ``{date}_{kind}.csv`` files older than ``keep_days`` before the newest one into monthly parquet files."""
+    files = sorted(Path(source_dir).glob(f"*_{kind}.csv"))
     if not files:
-        return pd.DataFrame()
-    frames = [pd.read_csv(file, dtype={"symbol": str, "date": str}) for file in files]
-    combined = pd.concat(frames, ignore_index=True)
-    return combined.drop_duplicates(subset=["date", "symbol"]).sort_values(["date", "symbol"]).reset_index(drop=True)
+        return []
+    newest = files[-1].name.split("_", 1)[0]
+    cutoff = (datetime.strptime(newest, "%Y%m%d") - timedelta(days=keep_days)).strftime("%Y%m%d")
+    by_month: dict[str, list[Path]] = {}
+    for file in files:
+        file_date = file.name.split("_", 1)[0]
+        if file_date < cutoff:
+            by_month.setdefault(file_date[:6], []).append(file)
+
+    archived = []
+    for month, month_files in sorted(by_month.items()):
+        path = Path(archive_dir) / kind / f"{month}_{kind}.parquet"
+        frames = [load_archive_file(path)] if path.exists() else []
+        frames += [pd.read_csv(file, dtype={"symbol": str, "date": str}) for file in month_files]
+        combined = pd.concat(frames, ignore_index=True)
+        combined = combined.drop_duplicates(subset=["date", "symbol"], keep="last").sort_values(["date", "symbol"])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        combined.reset_index(drop=True).to_parquet(tmp_path, index=False, compression="zstd")
+        tmp_path.replace(path)
+        # Dailies are removed only after their month file is safely in place.
+        for file in month_files:
+            file.unlink()
+            archived.append(file.name)
+    return archived
+
+
+def save_publish_manifest(path: Path, manifest: dict) -> None:
+    # Written last and swapped in atomically, so readers that watch it never see a half-published batch.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp_path.replace(path)
+
+
+def load_publish_manifest(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_history_cache(path: Path, histories: dict[str, pd.DataFrame]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pd.to_pickle(histories, path)
+
+
+def load_history_cache(path: Path) -> dict[str, pd.DataFrame]:
+    if not path.exists():
+        return {}
+    return pd.read_pickle(path)
+
+
+def save_rescore_snapshot(snapshot_dir: str, frame: pd.DataFrame, run_at: str) -> Path:
+    path = Path(snapshot_dir) / f"{run_at}_rescore.csv"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    frame.sort_values(["knee_score", "shoulder_score"], ascending=False).to_csv(path, index=False, encoding="utf-8-sig")
+    return path
+
+
+def prune_rescore_snapshots(snapshot_dir: str, keep: int) -> int:
+    # Snapshots are only read back as "latest", so older ones are dropped once there are more than ``keep``.
+    files = sorted(Path(snapshot_dir).glob("*_rescore.csv"))
+    stale = files[:-keep] if keep > 0 else []
+    for file in stale:
+        file.unlink()
+    return len(stale)
+
+
+def load_latest_rescore_snapshot(snapshot_dir: str) -> tuple[pd.DataFrame, str | None]:
+    files = sorted(Path(snapshot_dir).glob("*_rescore.csv"))
+    if not files:
+        return pd.DataFrame(), None
+    latest = files[-1]
+    return pd.read_csv(latest, dtype={"symbol": str, "date": str}), latest.stem.replace("_rescore", "")
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+# Regular KRX open; before it the quote endpoints still return the previous close.
+SESSION_OPEN = time(9, 0)
+
+
+def _to_day(date: str) -> np.datetime64:
+    return np.datetime64(datetime.strptime(date, "%Y%m%d").date(), "D")
+
+
+def _to_text(day: np.datetime64) -> str:
+    return str(day).replace("-", "")
+
+
+@dataclass
+class TradingCalendar:
+    holidays: list[str]
+    _calendar: np.busdaycalendar = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._calendar = np.busdaycalendar(weekmask="1111100", holidays=[_to_day(date) for date in self.holidays])
+
+    def is_session(self, date: str) -> bool:
+        return bool(np.is_busday(_to_day(date), busdaycal=self._calendar))
+
+    def previous_session(self, date: str) -> str:
+        """Latest session on or before ``date``."""
+        return _to_text(np.busday_offset(_to_day(date), 0, roll="backward", busdaycal=self._calendar))
+
+    def next_session(self, date: str) -> str:
+        """First session strictly after ``date``."""
+        return _to_text(np.busday_offset(_to_day(date), 1, roll="backward", busdaycal=self._calendar))
+
+    def shift_sessions(self, date: str, count: int) -> str:
+        return _to_text(np.busday_offset(_to_day(date), count, roll="backward", busdaycal=self._calendar))
+
+    def session_windows(self, start_date: str, end_date: str, size: int) -> list[tuple[str, str]]:
+        sessions = self.sessions(start_date, end_date)
+        return [(chunk[0], chunk[-1]) for chunk in (sessions[i : i + size] for i in range(0, len(sessions), size))]
+
+    def sessions(self, start_date: str, end_date: str) -> list[str]:
+        days = np.arange(_to_day(start_date), _to_day(end_date) + 1, dtype="datetime64[D]")
+        return [_to_text(day) for day in days[np.is_busday(days, busdaycal=self._calendar)]]
+
+    def session_count(self, start_date: str, end_date: str) -> int:
+        """Number of sessions in the half-open range [start_date, end_date)."""
+        return int(np.busday_count(_to_day(start_date), _to_day(end_date), busdaycal=self._calendar))
+
+
+def load_trading_calendar(path: str | None) -> TradingCalendar:
+    if not path or not Path(path).exists():
+        return TradingCalendar(holidays=[])
+    holidays = pd.read_csv(path, dtype={"date": str})["date"].dropna().str.strip()
+    return TradingCalendar(holidays=sorted(holidays))
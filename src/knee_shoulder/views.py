@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+
+
+# Shared by the dashboard and the JSON API so both list the same candidates in the same order.
+CANDIDATE_DISPLAY_MIN_SCORE = 50
+RECENT_VALIDATION_DATES = 5
+
+
+def load_latest_signals(signal_dir: str) -> tuple[pd.DataFrame, str | None]:
+    files = sorted(Path(signal_dir).glob("*_signals.csv"))
+    if not files:
+        return pd.DataFrame(), None
+    latest = files[-1]
+    return pd.read_csv(latest, dtype={"symbol": str, "date": str}), latest.stem.replace("_signals", "")
+
+
+def select_candidates(
+    signals: pd.DataFrame,
+    side: str,
+    min_score: int = CANDIDATE_DISPLAY_MIN_SCORE,
+    grade: str | None = None,
+) -> pd.DataFrame:
+    if side not in ("knee", "shoulder"):
+        raise ValueError(f"side must be knee or shoulder, got {side!r}")
+    view = signals[signals[f"{side}_score"] >= min_score]
+    if grade:
+        view = view[view[f"{side}_grade"] == grade]
+    # Knee candidates rank the strongest bounce first, shoulder candidates the sharpest drop.
+    return view.copy().sort_values([f"{side}_score", "pct_change"], ascending=[False, side == "shoulder"])
+
+
+def select_recent_validation(
+    validation: pd.DataFrame,
+    analysis_date: str,
+    min_score: int = CANDIDATE_DISPLAY_MIN_SCORE,
+    recent_dates: int = RECENT_VALIDATION_DATES,
+) -> pd.DataFrame:
+    if validation.empty:
+        return validation
+    view = validation[validation["signal_date"].astype(str) < analysis_date]
+    view = view[
+        (pd.to_numeric(view["knee_score"], errors="coerce") >= min_score)
+        | (pd.to_numeric(view["shoulder_score"], errors="coerce") >= min_score)
+    ].copy()
+    dates = sorted(view["signal_date"].astype(str).unique())[-recent_dates:]
+    view = view[view["signal_date"].astype(str).isin(dates)].copy()
+    return view.sort_values(["signal_date", "knee_score", "shoulder_score"], ascending=[False, False, False])
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import argparse
+import ast
+import subprocess
+import sys
+from pathlib import Path
+
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+
+# Modules that must not be imported just by loading an entry point.
+IMPORT_TARGETS = {
+    "run_daily": ["openpyxl", "requests", "plotly"],
+    "serve": ["openpyxl", "requests", "plotly", "streamlit"],
+    "src.knee_shoulder.kis_client": ["requests"],
+    "src.knee_shoulder.master": ["openpyxl"],
+}
+# Scripts executed by a runner (streamlit) are checked statically instead of imported.
+SCRIPT_TARGETS = {
+    "app.py": ["plotly"],
+}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure entry point import time with python -X importtime.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of cold interpreter runs per target")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail if the best import time of any target exceeds this")
+    return parser.parse_args()
+
+
+def measure_import(module: str) -> tuple[float, set[str]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_us = 0
+    loaded = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line.split("|")
+        name = parts[2].strip()
+        if not parts[1].strip().isdigit():
+            continue
+        loaded.add(name)
+        if name == module:
+            total_us = int(parts[1].strip())
+    return total_us / 1000.0, loaded
+
+
+def module_level_imports(script: Path) -> set[str]:
+    tree = ast.parse(script.read_text(encoding="utf-8"))
+    names = set()
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names.add(node.module)
+    return names
+
+
+def main() -> None:
+    args = parse_args()
+    failures = []
+
+    for module, forbidden in IMPORT_TARGETS.items():
+        timings = []
+        loaded = set()
+        for _ in range(max(args.repeat, 1)):
+            elapsed_ms, loaded = measure_import(module)
+            timings.append(elapsed_ms)
+        best = min(timings)
+        print(f"{module:<32} best {best:8.1f} ms  median {sorted(timings)[len(timings) // 2]:8.1f} ms")
+
+        eager = sorted(name for name in forbidden if name in loaded)
+        if eager:
+            failures.append(f"{module} eagerly imports {', '.join(eager)}")
+        if args.budget_ms is not None and best > args.budget_ms:
+            failures.append(f"{module} import took {best:.1f} ms (budget {args.budget_ms:.1f} ms)")
+
+    for script, forbidden in SCRIPT_TARGETS.items():
+        imported = module_level_imports(BASE_DIR / script)
+        eager = sorted(name for name in forbidden if any(item.split(".")[0] == name for item in imported))
+        if eager:
+            failures.append(f"{script} imports {', '.join(eager)} at module level")
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from urllib.parse import urlparse
+
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_PATHS = [
+    "/candidates?side=knee",
+    "/candidates?side=shoulder&page_size=20",
+    "/validation",
+    "/stats?side=knee&dimension=grade",
+    "/stats?side=knee&dimension=reason&horizon=5",
+]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure throughput and tail latency of serve.py.")
+    parser.add_argument("--url", default=None, help="Base URL of a running server; omit to start one on a free port")
+    parser.add_argument("--config", default=None, help="Config passed to the spawned server")
+    parser.add_argument("--path", action="append", default=None, help="Request path, repeatable (defaults to a mixed set)")
+    parser.add_argument("--series", type=int, default=5, help="Also request this many per-symbol series")
+    parser.add_argument("--requests", type=int, default=5000, help="Total requests across all workers")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--gzip", action="store_true", help="Send Accept-Encoding: gzip")
+    parser.add_argument("--etag", action="store_true", help="Revalidate with If-None-Match after the first response")
+    return parser.parse_args()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_health(base_url: str, timeout_sec: float = 60.0) -> dict:
+    url = urlparse(base_url)
+    deadline = time.monotonic() + timeout_sec
+    while True:
+        try:
+            connection = http.client.HTTPConnection(url.hostname, url.port, timeout=5)
+            connection.request("GET", "/health")
+            return json.loads(connection.getresponse().read())
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+def series_paths(base_url: str, count: int) -> list[str]:
+    if count <= 0:
+        return []
+    url = urlparse(base_url)
+    connection = http.client.HTTPConnection(url.hostname, url.port, timeout=10)
+    connection.request("GET", f"/candidates?side=knee&min_score=0&page_size={count}")
+    items = json.loads(connection.getresponse().read())["items"]
+    return [f"/series/{item['symbol']}" for item in items]
+
+
+def worker(base_url: str, paths: list[str], count: int, offset: int, args: argparse.Namespace, results: list) -> None:
+    url = urlparse(base_url)
+    connection = http.client.HTTPConnection(url.hostname, url.port, timeout=30)
+    etags: dict[str, str] = {}
+    for index in range(count):
+        path = paths[(offset + index) % len(paths)]
+        headers = {"Accept-Encoding": "gzip"} if args.gzip else {}
+        if args.etag and path in etags:
+            headers["If-None-Match"] = etags[path]
+        started = time.perf_counter()
+        try:
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+            if response.getheader("ETag"):
+                etags[path] = response.getheader("ETag")
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            connection = http.client.HTTPConnection(url.hostname, url.port, timeout=30)
+            status = "error"
+        results.append((time.perf_counter() - started, status))
+    connection.close()
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def main() -> None:
+    args = parse_args()
+    server = None
+    base_url = args.url
+    if base_url is None:
+        port = free_port()
+        command = [sys.executable, str(BASE_DIR / "serve.py"), "--port", str(port)]
+        if args.config:
+            command += ["--config", args.config]
+        server = subprocess.Popen(command, cwd=BASE_DIR, stderr=subprocess.DEVNULL)
+        base_url = f"http://127.0.0.1:{port}"
+
+    try:
+        health = wait_for_health(base_url)
+        paths = (args.path or DEFAULT_PATHS) + series_paths(base_url, args.series)
+        per_worker = [args.requests // args.concurrency + (1 if i < args.requests % args.concurrency else 0) for i in range(args.concurrency)]
+        results: list = []
+        threads = [
+            threading.Thread(target=worker, args=(base_url, paths, count, i, args, results))
+            for i, count in enumerate(per_worker)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    latencies = sorted(latency * 1000.0 for latency, _ in results)
+    statuses = Counter(str(status) for _, status in results)
+    print(f"snapshot   : {health['version']} ({health['date']})")
+    print(f"paths      : {len(paths)}, concurrency {args.concurrency}, gzip {args.gzip}, etag {args.etag}")
+    print(f"requests   : {len(results)} in {elapsed:.2f} s ({len(results) / elapsed:,.0f} req/s)")
+    print(
+        "latency ms : "
+        f"p50 {percentile(latencies, 50):.2f}  p95 {percentile(latencies, 95):.2f}  "
+        f"p99 {percentile(latencies, 99):.2f}  max {latencies[-1]:.2f}"
+    )
+    print("status     : " + ", ".join(f"{status} x{count}" for status, count in sorted(statuses.items())))
+    if statuses.get("error"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
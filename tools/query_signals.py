@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from contextlib import closing
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.knee_shoulder.config import load_config
+from src.knee_shoulder.signal_store import (
+    open_signal_store,
+    ROLLUP_DIMENSIONS,
+    query_rollups,
+    query_signals,
+    query_validation,
+    sync_signal_files,
+    sync_validation_file,
+    update_rollups,
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Query the indexed signal history store.")
+    parser.add_argument("--config", default=None, help="Path to config.json")
+    parser.add_argument("--symbol", default=None)
+    parser.add_argument("--side", choices=["knee", "shoulder"], default="knee")
+    parser.add_argument("--grade", default=None, help="Strong / Watch / Neutral")
+    parser.add_argument("--min-score", type=int, default=None)
+    parser.add_argument("--since", default=None, help="YYYYMMDD")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--validation", action="store_true", help="Query validation rows instead of signals")
+    parser.add_argument("--rollup", choices=ROLLUP_DIMENSIONS, default=None, help="Show cumulative win-rate stats")
+    parser.add_argument("--horizon", type=int, default=None, help="Forward days for --rollup")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    config = load_config(args.config)
+    paths = config["paths"]
+    with closing(open_signal_store(paths["signal_db"])) as store:
+        imported = sync_signal_files(store, paths["signal_dir"], paths.get("archive_dir"))
+        sync_validation_file(store, paths["validation_file"])
+        update_rollups(store, config["validation"])
+        started = time.perf_counter()
+        if args.rollup:
+            frame = query_rollups(store, side=args.side, dimension=args.rollup, horizon=args.horizon)
+        elif args.validation:
+            frame = query_validation(store, symbol=args.symbol, since=args.since).head(args.limit)
+        else:
+            frame = query_signals(
+                store,
+                symbol=args.symbol,
+                side=args.side,
+                grade=args.grade,
+                min_score=args.min_score,
+                since=args.since,
+                limit=args.limit,
+            )
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+    print(frame.to_string(index=False))
+    print(f"{len(frame)} rows in {elapsed_ms:.1f} ms ({imported} signal files imported)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+VOLATILE_COLUMNS = ["fetched_at", "run_at"]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run a sharded batch against the stub KIS server and compare it to a single run.")
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--config", default=str(BASE_DIR / "config.json"))
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Stub server latency per request")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary work directories")
+    return parser.parse_args()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def prepare_workdir(root: Path, config_path: str) -> Path:
+    with open(config_path, "r", encoding="utf-8") as file:
+        config = json.load(file)
+    master_source = BASE_DIR / config["paths"]["stock_master"]
+    for key, value in config["paths"].items():
+        config["paths"][key] = str(root / value)
+    config["runtime"]["request_sleep_sec"] = 0
+    Path(config["paths"]["stock_master"]).parent.mkdir(parents=True, exist_ok=True)
+    shutil.copy(master_source, config["paths"]["stock_master"])
+    workdir_config = root / "config.json"
+    workdir_config.write_text(json.dumps(config, ensure_ascii=False, indent=2), encoding="utf-8")
+    return workdir_config
+
+
+def run(command: list[str], env: dict) -> None:
+    subprocess.run(command, cwd=BASE_DIR, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def load_output(root: Path, subdir: str) -> pd.DataFrame:
+    files = sorted((root / subdir).glob("*.csv"))
+    frame = pd.read_csv(files[-1], dtype={"symbol": str, "date": str})
+    return frame.drop(columns=[column for column in VOLATILE_COLUMNS if column in frame.columns])
+
+
+def main() -> None:
+    args = parse_args()
+    port = free_port()
+    env = dict(
+        os.environ,
+        KIS_BASE_URL=f"http://127.0.0.1:{port}",
+        KIS_APP_KEY="stub",
+        KIS_APP_SECRET="stub",
+    )
+    server = subprocess.Popen(
+        [sys.executable, str(BASE_DIR / "tools" / "stub_kis_server.py"), "--port", str(port), "--latency-ms", str(args.latency_ms)],
+        stdout=subprocess.PIPE,
+    )
+    server.stdout.readline()
+
+    single_root = Path(tempfile.mkdtemp(prefix="ks_single_"))
+    sharded_root = Path(tempfile.mkdtemp(prefix="ks_sharded_"))
+    try:
+        single_config = prepare_workdir(single_root, args.config)
+        started = time.perf_counter()
+        run([sys.executable, "run_daily.py", "--config", str(single_config)], env)
+        single_sec = time.perf_counter() - started
+
+        sharded_config = prepare_workdir(sharded_root, args.config)
+        started = time.perf_counter()
+        workers = [
+            subprocess.Popen(
+                [sys.executable, "run_daily.py", "--config", str(sharded_config), "--shard", f"{index}/{args.shards}"],
+                cwd=BASE_DIR,
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            for index in range(args.shards)
+        ]
+        if any(worker.wait() != 0 for worker in workers):
+            raise SystemExit("A shard process failed")
+        run([sys.executable, "run_daily.py", "--config", str(sharded_config), "--merge-shards", str(args.shards)], env)
+        sharded_sec = time.perf_counter() - started
+
+        print(f"single run : {single_sec:6.2f} s")
+        print(f"{args.shards} shards   : {sharded_sec:6.2f} s (including merge)")
+        for subdir in ("data/patches", "data/signals"):
+            single = load_output(single_root, subdir)
+            sharded = load_output(sharded_root, subdir)
+            key = ["symbol"]
+            pd.testing.assert_frame_equal(
+                single.sort_values(key).reset_index(drop=True),
+                sharded.sort_values(key).reset_index(drop=True),
+            )
+            print(f"{subdir}: {len(sharded)} rows match the single run")
+    finally:
+        server.terminate()
+        server.wait()
+        if not args.keep:
+            shutil.rmtree(single_root, ignore_errors=True)
+            shutil.rmtree(sharded_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
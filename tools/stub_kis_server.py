@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import time
+import zlib
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+# Offline stand-in for the KIS endpoints used by kis_client. Prices are a deterministic
+# function of (symbol, date) so repeated and sharded runs produce identical outputs.
+MAX_ROWS = 100
+
+
+def _noise(symbol: str, date: str, salt: str) -> float:
+    return (zlib.crc32(f"{symbol}:{date}:{salt}".encode("ascii")) % 10_000) / 10_000.0
+
+
+def synthetic_bar(symbol: str, date: str) -> dict:
+    ordinal = datetime.strptime(date, "%Y%m%d").toordinal()
+    base = 5_000 + zlib.crc32(symbol.encode("ascii")) % 95_000
+    phase = _noise(symbol, "", "phase") * 2 * math.pi
+    close = base * (1.0 + 0.15 * math.sin(ordinal / 17.0 + phase) + 0.03 * (_noise(symbol, date, "close") - 0.5))
+    open_ = close * (1.0 + 0.02 * (_noise(symbol, date, "open") - 0.5))
+    high = max(open_, close) * (1.0 + 0.01 * _noise(symbol, date, "high"))
+    low = min(open_, close) * (1.0 - 0.01 * _noise(symbol, date, "low"))
+    volume = int(50_000 + 2_000_000 * _noise(symbol, date, "volume"))
+    return {
+        "stck_bsop_date": date,
+        "stck_oprc": str(int(open_)),
+        "stck_hgpr": str(int(high)),
+        "stck_lwpr": str(int(low)),
+        "stck_clpr": str(int(close)),
+        "acml_vol": str(volume),
+        "acml_tr_pbmn": str(int(volume * close)),
+    }
+
+
+def synthetic_flow(symbol: str, date: str) -> dict:
+    record = {"stck_bsop_date": date}
+    for investor in ("frgn", "orgn", "prsn"):
+        qty = int(200_000 * (_noise(symbol, date, investor) - 0.5))
+        record[f"{investor}_ntby_qty"] = str(qty)
+        record[f"{investor}_ntby_tr_pbmn"] = str(qty * 10)
+    return record
+
+
+def weekdays(start: str, end: str) -> list[str]:
+    current = datetime.strptime(start, "%Y%m%d")
+    last = datetime.strptime(end, "%Y%m%d")
+    days = []
+    while current <= last:
+        if current.weekday() < 5:
+            days.append(current.strftime("%Y%m%d"))
+        current += timedelta(days=1)
+    return days
+
+
+class StubKisHandler(BaseHTTPRequestHandler):
+    latency_sec = 0.0
+
+    def log_message(self, format: str, *args) -> None:
+        return
+
+    def _reply(self, payload: dict) -> None:
+        if self.latency_sec:
+            time.sleep(self.latency_sec)
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("content-type", "application/json; charset=utf-8")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self) -> None:
+        if urlparse(self.path).path == "/oauth2/tokenP":
+            self._reply({"access_token": "stub-token", "token_type": "Bearer", "expires_in": 86400})
+            return
+        self.send_error(404)
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query, keep_blank_values=True).items()}
+        symbol = params.get("FID_INPUT_ISCD", "000000")
+        today = datetime.now().strftime("%Y%m%d")
+
+        if url.path.endswith("/inquire-daily-itemchartprice"):
+            days = weekdays(params["FID_INPUT_DATE_1"], params["FID_INPUT_DATE_2"])[-MAX_ROWS:]
+            self._reply({"rt_cd": "0", "output2": [synthetic_bar(symbol, day) for day in reversed(days)]})
+        elif url.path.endswith("/inquire-price"):
+            bar = synthetic_bar(symbol, today)
+            bar["stck_prpr"] = bar.pop("stck_clpr")
+            self._reply({"rt_cd": "0", "output": bar})
+        elif url.path.endswith("/investor-trade-by-stock-daily"):
+            end = params.get("FID_INPUT_DATE_1") or today
+            start = (datetime.strptime(end, "%Y%m%d") - timedelta(days=45)).strftime("%Y%m%d")
+            days = weekdays(start, end)
+            self._reply({"rt_cd": "0", "output2": [synthetic_flow(symbol, day) for day in reversed(days)]})
+        else:
+            self.send_error(404)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve deterministic fake KIS responses for local runs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Artificial delay added to every response")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    StubKisHandler.latency_sec = args.latency_ms / 1000.0
+    server = ThreadingHTTPServer((args.host, args.port), StubKisHandler)
+    print(f"Stub KIS server listening on http://{args.host}:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()